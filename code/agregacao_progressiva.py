@@ -0,0 +1,282 @@
+import argparse
+import math
+import os
+import random
+import time
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import consolidate_results
+import reports_generator
+
+# --- CONFIGURE AQUI ---
+# Nível de confiança dos intervalos e critérios de paragem antecipada:
+# meia-largura relativa máxima para médias/medianas e absoluta para as
+# correlações.
+NIVEL_CONFIANCA = 0.95
+PRECISAO_RELATIVA = 0.05
+PRECISAO_CORRELACAO = 0.10
+
+# Mínimos antes de se poder parar: repositórios no total e em cada grupo
+MIN_REPOS = 30
+MIN_POR_GRUPO = 10
+
+# Frequência das estimativas intermédias
+INTERVALO_ATUALIZACAO_S = 5.0
+LOTE_ATUALIZACAO = 25
+
+SEMENTE = 42
+SAIDA = 'tabela_resumo_progressiva.csv'
+# --- FIM DA CONFIGURAÇÃO ---
+
+METRICAS_QUALIDADE = ['cbo_median', 'dit_median', 'lcom_median']
+METRICAS_PROCESSO = ['popularidade_estrelas', 'maturidade_anos', 'atividade_releases', 'total_loc']
+
+# Mesmos grupos (tercis) de tables_generator.calcular_tabela_resumo
+RQ_CONFIGS = {
+    'Maturidade (RQ02)': {'col': 'maturidade_anos', 'labels': ['Jovens', 'Intermediários', 'Maduros']},
+    'Atividade (RQ03)': {'col': 'atividade_releases', 'labels': ['Baixa', 'Moderada', 'Alta']},
+    'Tamanho (RQ04)': {'col': 'total_loc', 'labels': ['Pequenos', 'Médios', 'Grandes']},
+}
+
+
+def _z(nivel=NIVEL_CONFIANCA):
+    return NormalDist().inv_cdf(0.5 + nivel / 2)
+
+
+def ic_media(valores, populacao, z):
+    """
+    Média com intervalo normal e correção para população finita (a amostra
+    é sem reposição de um corpus de tamanho conhecido).
+    """
+    n = len(valores)
+    media = float(np.mean(valores))
+    if n < 2:
+        return media, -math.inf, math.inf
+    meia = z * float(np.std(valores, ddof=1)) / math.sqrt(n) * _fpc(n, populacao)
+    return media, media - meia, media + meia
+
+
+def _fpc(n, populacao):
+    return math.sqrt(max(populacao - n, 0) / (populacao - 1)) if populacao > 1 else 0.0
+
+
+def ic_mediana(valores, populacao, z):
+    """
+    Mediana com intervalo de estatísticas de ordem (aproximação binomial),
+    com a mesma correção para população finita das médias: com o grupo
+    inteiro lido, o valor é exato.
+    """
+    ordenados = np.sort(np.asarray(valores, dtype=float))
+    n = len(ordenados)
+    mediana = float(np.median(ordenados))
+    if n >= populacao:
+        return mediana, mediana, mediana
+    k = z * math.sqrt(n) / 2 * _fpc(n, populacao)
+    inferior = int(math.floor(n / 2 - k))
+    superior = int(math.ceil(n / 2 + k))
+    if inferior < 0 or superior >= n:
+        return mediana, -math.inf, math.inf
+    return mediana, float(ordenados[inferior]), float(ordenados[superior])
+
+
+def ic_correlacao(x, y, populacao, z):
+    """
+    Correlação de Pearson com intervalo pela transformação de Fisher,
+    reduzido pela correção para população finita (exato com o corpus
+    inteiro lido).
+    """
+    n = len(x)
+    if n < 4:
+        return float('nan'), -1.0, 1.0
+    if np.std(x) == 0 or np.std(y) == 0:
+        # Correlação indefinida (variável constante): não entra no critério de paragem
+        return float('nan'), float('nan'), float('nan')
+    r = float(np.corrcoef(x, y)[0, 1])
+    if n >= populacao:
+        return r, r, r
+    fisher = math.atanh(max(min(r, 0.999999), -0.999999))
+    meia = z / math.sqrt(n - 3) * _fpc(n, populacao)
+    return r, math.tanh(fisher - meia), math.tanh(fisher + meia)
+
+
+def calcular_estimativas(df, total_repos, limites_fixos, z):
+    """
+    Estimativas da tabela de resumo (médias gerais, médias e medianas por
+    grupo de cada RQ) e das correlações processo x qualidade, cada uma com
+    o seu intervalo de confiança.
+    """
+    linhas = []
+
+    def adicionar(analise, grupo, metrica, estatistica, resultado, n):
+        estimativa, inferior, superior = resultado
+        linhas.append({
+            'analise': analise, 'grupo': grupo, 'metrica': metrica, 'estatistica': estatistica,
+            'estimativa': estimativa, 'ic_inferior': inferior, 'ic_superior': superior, 'n': n,
+        })
+
+    for metrica in METRICAS_QUALIDADE + METRICAS_PROCESSO:
+        valores = df[metrica].dropna().to_numpy()
+        if len(valores):
+            adicionar('Análise Geral', 'Todos', metrica, 'media', ic_media(valores, total_repos, z), len(valores))
+
+    for rq_name, config in RQ_CONFIGS.items():
+        col = config['col']
+        # Limites conhecidos para todo o corpus (metadados) ou, para o LOC,
+        # estimados a partir da amostra atual.
+        quantis = limites_fixos.get(col)
+        if quantis is None:
+            quantis = df[col].quantile([0.33, 0.66]).values
+        bins = [-float('inf'), quantis[0], quantis[1], float('inf')]
+        grupos = pd.cut(df[col], bins=bins, labels=config['labels'])
+
+        for label in config['labels']:
+            subconjunto = df[grupos == label]
+            n = len(subconjunto)
+            if n == 0:
+                continue
+            populacao_grupo = max(round(total_repos * n / len(df)), n)
+            for metrica in METRICAS_QUALIDADE:
+                valores = subconjunto[metrica].dropna().to_numpy()
+                adicionar(rq_name, label, metrica, 'media', ic_media(valores, populacao_grupo, z), n)
+                adicionar(rq_name, label, metrica, 'mediana', ic_mediana(valores, populacao_grupo, z), n)
+
+    for processo in METRICAS_PROCESSO:
+        for qualidade in METRICAS_QUALIDADE:
+            pares = df[[processo, qualidade]].dropna()
+            adicionar('Correlação', processo, qualidade, 'pearson',
+                      ic_correlacao(pares[processo].to_numpy(), pares[qualidade].to_numpy(), total_repos, z), len(pares))
+
+    return pd.DataFrame(linhas)
+
+
+def pior_precisao(estimativas):
+    """
+    Devolve (maior meia-largura relativa das médias/medianas, maior
+    meia-largura absoluta das correlações).
+    """
+    meia = (estimativas['ic_superior'] - estimativas['ic_inferior']) / 2
+    correlacoes = estimativas['estatistica'] == 'pearson'
+    relativa = meia[~correlacoes] / estimativas.loc[~correlacoes, 'estimativa'].abs().replace(0, np.nan)
+    # Estimativas nulas (ex.: mediana do LCOM = 0) usam a meia-largura absoluta
+    relativa = relativa.fillna(meia[~correlacoes])
+    meia_correlacoes = meia[correlacoes].dropna()
+    return float(relativa.max()), float(meia_correlacoes.max()) if len(meia_correlacoes) else 0.0
+
+
+def agregar_progressivamente(pasta, precisao=PRECISAO_RELATIVA, precisao_correlacao=PRECISAO_CORRELACAO,
+                             semente=SEMENTE, intervalo=INTERVALO_ATUALIZACAO_S, lote=LOTE_ATUALIZACAO,
+                             saida=SAIDA):
+    """
+    Lê os ficheiros de classes por ordem aleatória e vai refinando as
+    estimativas da tabela de resumo, parando assim que todas atingirem a
+    precisão pedida (ou quando o corpus acabar).
+    """
+    z = _z()
+    metadata_path = os.path.join(pasta, consolidate_results.METADATA_FILE)
+    if not os.path.exists(metadata_path):
+        print(f"ERRO: O ficheiro '{metadata_path}' não foi encontrado.")
+        return None
+
+    metadata_df = pd.read_csv(metadata_path, engine='python', on_bad_lines='warn')
+    metadata_df['repository'] = metadata_df['nameWithOwner'].str.split('/', expand=True)[1]
+    metadados = metadata_df.drop_duplicates('repository').set_index('repository')
+
+    ficheiros = sorted(f for f in os.listdir(pasta) if f.endswith("class.csv")
+                       and f[:-len("class.csv")] in metadados.index)
+    if not ficheiros:
+        print("ERRO: Nenhum ficheiro 'class.csv' com metadados correspondentes foi encontrado.")
+        return None
+    random.Random(semente).shuffle(ficheiros)
+    total = len(ficheiros)
+
+    # Os grupos de maturidade e atividade dependem só dos metadados, que já
+    # são conhecidos para todo o corpus.
+    corpus = metadados.loc[[f[:-len("class.csv")] for f in ficheiros]]
+    limites_fixos = {
+        col: corpus[col].quantile([0.33, 0.66]).values
+        for col in ('maturidade_anos', 'atividade_releases')
+    }
+
+    print(f"Agregação progressiva de {total} repositórios (precisão relativa {precisao:.0%}, "
+          f"correlações ±{precisao_correlacao}, confiança {NIVEL_CONFIANCA:.0%})...")
+
+    linhas = []
+    estimativas = None
+    # Ficheiros ilegíveis ou sem métricas saem da população, para que com
+    # todos os restantes lidos as estimativas sejam exatas.
+    populacao = total
+    atingida = False
+    ultima_atualizacao = time.monotonic()
+    inicio = time.monotonic()
+
+    def atualizar(i):
+        amostra = pd.DataFrame(linhas)
+        resultado = calcular_estimativas(amostra, populacao, limites_fixos, z)
+        resultado.to_csv(saida, index=False)
+        relativa, correlacao = pior_precisao(resultado)
+        print(f"[{i}/{total} repositórios, {time.monotonic() - inicio:.1f}s] pior meia-largura: "
+              f"{relativa:.1%} (médias/medianas), ±{correlacao:.3f} (correlações)")
+        grupos_ok = resultado.loc[resultado['analise'] != 'Correlação', 'n'].min() >= MIN_POR_GRUPO
+        ok = (len(amostra) >= MIN_REPOS and grupos_ok
+              and relativa <= precisao and correlacao <= precisao_correlacao)
+        return resultado, ok
+
+    for i, filename in enumerate(ficheiros, start=1):
+        repo = filename[:-len("class.csv")]
+        try:
+            df = pd.read_csv(os.path.join(pasta, filename))
+        except Exception as e:
+            print(f"  - ERRO: Não foi possível ler '{filename}'. Erro: {e}")
+            populacao -= 1
+            continue
+        resumo = reports_generator.summarize_repository(repo, df) if not df.empty else None
+        if resumo is None:
+            populacao -= 1
+            continue
+        resumo.update(metadados.loc[repo, ['popularidade_estrelas', 'maturidade_anos', 'atividade_releases']].to_dict())
+        linhas.append(resumo)
+
+        # O último ficheiro fica para a estimativa final, depois do ciclo
+        agora = time.monotonic()
+        if (i % lote and agora - ultima_atualizacao < intervalo) or i == total:
+            continue
+        ultima_atualizacao = agora
+        if len(linhas) < 4:
+            continue
+
+        estimativas, atingida = atualizar(i)
+        if atingida:
+            print(f"Precisão atingida após {i} de {total} repositórios ({i / total:.0%} do corpus).")
+            break
+    else:
+        # Estimativa final sobre tudo o que foi lido, mesmo que os últimos
+        # ficheiros tenham sido ignorados depois da última atualização
+        if len(linhas) >= 4:
+            estimativas, atingida = atualizar(total)
+        print(f"Corpus completo processado: {len(linhas)} repositórios utilizáveis de {total}"
+              + ("." if atingida else "; a precisão pedida não foi atingida."))
+
+    if estimativas is not None:
+        tabela = estimativas[estimativas['estatistica'] == 'media'].pivot_table(
+            index=['analise', 'grupo'], columns='metrica', values='estimativa', sort=False)
+        print("\n" + "="*80)
+        print("Tabela de Resumo (estimativas progressivas, médias):")
+        print(tabela.round(2).to_string())
+        print("="*80)
+        print(f"Estimativas com intervalos de confiança guardadas em: '{saida}'")
+    return estimativas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Estimativas progressivas da tabela de resumo, com intervalos de confiança.")
+    parser.add_argument('--pasta', default=reports_generator.PATH_TO_OUTPUT_FOLDER)
+    parser.add_argument('--precisao', type=float, default=PRECISAO_RELATIVA)
+    parser.add_argument('--precisao-correlacao', type=float, default=PRECISAO_CORRELACAO)
+    parser.add_argument('--semente', type=int, default=SEMENTE)
+    args = parser.parse_args()
+
+    agregar_progressivamente(args.pasta, args.precisao, args.precisao_correlacao, args.semente)
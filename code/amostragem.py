@@ -0,0 +1,174 @@
+import argparse
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURE AQUI ---
+# Métricas de classe guardadas nos reservatórios
+METRICAS = ['loc', 'cbo', 'dit', 'lcom']
+
+# Cada repositório é dividido em estratos pelos tercis de LOC das suas
+# classes; cada estrato tem o seu reservatório de tamanho fixo.
+COLUNA_ESTRATO = 'loc'
+ESTRATOS = ['Pequenas', 'Médias', 'Grandes']
+# Classes sem valor na coluna de estratificação têm um estrato próprio
+ESTRATO_SEM_VALOR = 'Sem valor'
+TAMANHO_RESERVATORIO = 100
+
+SEMENTE = 42
+# --- FIM DA CONFIGURAÇÃO ---
+
+
+class Reservatorio:
+    """
+    Amostra aleatória simples de tamanho fixo sobre um fluxo de linhas
+    (algoritmo R), atualizada em lote a partir de arrays numpy.
+    """
+
+    def __init__(self, capacidade, n_colunas, semente):
+        self.capacidade = capacidade
+        self.dados = np.empty((capacidade, n_colunas))
+        self.vistos = 0
+        self.rng = np.random.default_rng(semente)
+
+    def adicionar(self, linhas):
+        n = len(linhas)
+        if n == 0:
+            return
+
+        livres = min(max(self.capacidade - self.vistos, 0), n)
+        if livres:
+            self.dados[self.vistos:self.vistos + livres] = linhas[:livres]
+
+        resto = linhas[livres:]
+        if len(resto):
+            # A i-ésima linha do fluxo (base 1) substitui uma posição j < capacidade
+            # com probabilidade capacidade / i.
+            posicoes = np.arange(self.vistos + livres + 1, self.vistos + n + 1)
+            destinos = (self.rng.random(len(resto)) * posicoes).astype(np.int64)
+            for origem in np.nonzero(destinos < self.capacidade)[0]:
+                self.dados[destinos[origem]] = resto[origem]
+
+        self.vistos += n
+
+    @property
+    def amostra(self):
+        return self.dados[:min(self.vistos, self.capacidade)]
+
+    @property
+    def peso(self):
+        """
+        Número de linhas do fluxo representadas por cada linha da amostra.
+        """
+        return self.vistos / len(self.amostra) if self.vistos else 0.0
+
+
+def amostra_ponderada(df, n, semente=SEMENTE):
+    """
+    Sorteia n linhas sem reposição com probabilidade proporcional a 'peso'
+    (método de Efraimidis-Spirakis), o que aproxima uma amostra uniforme
+    do corpus completo. O 'peso' devolvido é o número de classes do corpus
+    representadas por cada linha sorteada.
+    """
+    if n >= len(df):
+        return df.copy()
+    rng = np.random.default_rng(semente)
+    chaves = np.log(rng.random(len(df))) / df['peso'].to_numpy()
+    escolhidas = np.argsort(chaves)[-n:]
+    amostra = df.iloc[np.sort(escolhidas)].copy()
+    amostra['peso'] = df['peso'].sum() / n
+    return amostra.reset_index(drop=True)
+
+
+class AmostradorEstratificado:
+    """
+    Mantém um reservatório por (repositório, estrato) durante a leitura dos
+    ficheiros de classes, numa única passagem. Cada reservatório tem a sua
+    própria semente, derivada da chave, para que o resultado não dependa da
+    ordem em que os ficheiros são lidos.
+    """
+
+    def __init__(self, capacidade=TAMANHO_RESERVATORIO, semente=SEMENTE,
+                 metricas=METRICAS, coluna_estrato=COLUNA_ESTRATO, estratos=ESTRATOS):
+        self.capacidade = capacidade
+        self.semente = semente
+        self.metricas = list(metricas)
+        self.coluna_estrato = coluna_estrato
+        self.estratos = list(estratos)
+        self.reservatorios = {}
+
+    def _reservatorio(self, repo, estrato):
+        chave = (repo, estrato)
+        if chave not in self.reservatorios:
+            semente = self.semente ^ zlib.crc32(f"{repo}|{estrato}".encode('utf-8'))
+            self.reservatorios[chave] = Reservatorio(self.capacidade, len(self.metricas), semente)
+        return self.reservatorios[chave]
+
+    def adicionar(self, repo, df):
+        """
+        Acrescenta as classes de um repositório (ou um bloco delas).
+        Devolve False se faltarem colunas de métricas.
+        """
+        if not all(col in df.columns for col in self.metricas):
+            return False
+
+        valores = df[self.metricas].to_numpy(dtype=float)
+        com_valor = df[self.coluna_estrato].notna().to_numpy()
+        codigos = np.full(len(df), -1)
+        if com_valor.sum() >= len(self.estratos):
+            ranking = df.loc[com_valor, self.coluna_estrato].rank(method='first')
+            codigos[com_valor] = pd.qcut(ranking, len(self.estratos), labels=False).to_numpy()
+        else:
+            codigos[com_valor] = 0
+
+        for codigo, estrato in enumerate(self.estratos):
+            self._reservatorio(repo, estrato).adicionar(valores[codigos == codigo])
+        if not com_valor.all():
+            self._reservatorio(repo, ESTRATO_SEM_VALOR).adicionar(valores[codigos == -1])
+        return True
+
+    def para_dataframe(self):
+        """
+        Conteúdo de todos os reservatórios, com o repositório, o estrato e o
+        peso (inverso da probabilidade de inclusão) de cada linha.
+        """
+        partes = []
+        for (repo, estrato), reservatorio in sorted(self.reservatorios.items()):
+            if not len(reservatorio.amostra):
+                continue
+            parte = pd.DataFrame(reservatorio.amostra, columns=self.metricas)
+            parte.insert(0, 'estrato', estrato)
+            parte.insert(0, 'repository', repo)
+            parte['peso'] = reservatorio.peso
+            partes.append(parte)
+        if not partes:
+            return pd.DataFrame(columns=['repository', 'estrato'] + self.metricas + ['peso'])
+        return pd.concat(partes, ignore_index=True)
+
+    def amostra(self, n=None, semente=None):
+        """
+        Amostra ponderada de n classes de todo o corpus (ou o conteúdo
+        completo dos reservatórios, se n não for indicado).
+        """
+        df = self.para_dataframe()
+        if n is None:
+            return df
+        return amostra_ponderada(df, n, self.semente if semente is None else semente)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sorteia uma amostra ponderada a partir dos reservatórios guardados por reports_generator.py.")
+    parser.add_argument('reservatorios', help="CSV com os reservatórios (ex.: amostra_classes.csv)")
+    parser.add_argument('-n', type=int, required=True, help="tamanho da amostra")
+    parser.add_argument('--colunas', nargs='+', help="colunas a exportar (ex.: loc cbo)")
+    parser.add_argument('--semente', type=int, default=SEMENTE)
+    parser.add_argument('-o', '--saida', required=True)
+    args = parser.parse_args()
+
+    amostra = amostra_ponderada(pd.read_csv(args.reservatorios), args.n, args.semente)
+    if args.colunas:
+        amostra = amostra[args.colunas]
+    amostra.to_csv(args.saida, index=False)
+    print(f"Amostra de {len(amostra)} linhas guardada em: '{args.saida}'")
@@ -1,6 +1,9 @@
 import os
 import pandas as pd
 
+import instrumentacao
+from dataset import publicar_arrow
+
 # --- CONFIGURE AQUI ---
 # Confirme se este é o caminho para a pasta principal onde os
 # seus ficheiros CSV estão salvos.
@@ -15,6 +18,32 @@ FINAL_OUTPUT_FILE = "final_analysis_dataset.csv"
 # --- FIM DA CONFIGURAÇÃO ---
 
 
+def join_datasets(ck_df, metadata_df):
+    """
+    Junta o resumo do CK com os metadados pelo nome simples do repositório.
+    """
+    # --- CORREÇÃO DE NOMES ---
+    # Cria uma nova coluna com o nome simples do repositório para a junção.
+    metadata_df = metadata_df.copy()
+    metadata_df['repo_name_simple'] = metadata_df['nameWithOwner'].str.split('/', expand=True)[1]
+
+    # --- Realizar a junção (merge) ---
+    final_df = pd.merge(
+        left=ck_df,
+        right=metadata_df,
+        left_on='repository',
+        right_on='repo_name_simple',
+        how='inner'
+    )
+
+    # Limpeza do DataFrame final
+    if 'repo_name_simple' in final_df.columns:
+        final_df = final_df.drop(columns=['repo_name_simple'])
+    if 'nameWithOwner' in final_df.columns:
+        final_df = final_df.rename(columns={'nameWithOwner': 'repository_full_name'})
+    return final_df
+
+
 def merge_datasets_with_fix():
     """
     Junta os datasets corrigindo a incompatibilidade de nomes de repositório
@@ -33,43 +62,40 @@ def merge_datasets_with_fix():
     try:
         # Carregar os datasets
         print("Lendo os arquivos...")
-        ck_df = pd.read_csv(ck_file_path)
-
-        # --- CORREÇÃO DEFINITIVA PARA LEITURA APLICADA AQUI ---
-        # Adicionado on_bad_lines='warn' para avisar sobre linhas mal formatadas em vez de falhar.
-        # Mantido engine='python' para maior flexibilidade.
-        print(f"Lendo metadados de '{METADATA_FILE}' (com tratamento de erros)...")
-        metadata_df = pd.read_csv(metadata_file_path, engine='python', on_bad_lines='warn')
-
-        # --- CORREÇÃO DE NOMES ---
-        # Cria uma nova coluna com o nome simples do repositório para a junção.
-        print("Padronizando os nomes dos repositórios para a junção...")
-        metadata_df['repo_name_simple'] = metadata_df['nameWithOwner'].str.split('/', expand=True)[1]
-
-        # --- Realizar a junção (merge) ---
-        print("Realizando a junção dos dados...")
-        final_df = pd.merge(
-            left=ck_df,
-            right=metadata_df,
-            left_on='repository',
-            right_on='repo_name_simple',
-            how='inner'
-        )
-
-        # Limpeza do DataFrame final
-        if 'repo_name_simple' in final_df.columns:
-            final_df = final_df.drop(columns=['repo_name_simple'])
-        if 'nameWithOwner' in final_df.columns:
-            final_df = final_df.rename(columns={'nameWithOwner': 'repository_full_name'})
+        with instrumentacao.etapa("leitura"):
+            ck_df = pd.read_csv(ck_file_path)
+
+            # --- CORREÇÃO DEFINITIVA PARA LEITURA APLICADA AQUI ---
+            # Adicionado on_bad_lines='warn' para avisar sobre linhas mal formatadas em vez de falhar.
+            # Mantido engine='python' para maior flexibilidade.
+            print(f"Lendo metadados de '{METADATA_FILE}' (com tratamento de erros)...")
+            metadata_df = pd.read_csv(metadata_file_path, engine='python', on_bad_lines='warn')
+            instrumentacao.contar(
+                linhas=len(ck_df) + len(metadata_df),
+                bytes_processados=os.path.getsize(ck_file_path) + os.path.getsize(metadata_file_path)
+            )
+
+        print("Padronizando os nomes dos repositórios e realizando a junção dos dados...")
+        with instrumentacao.etapa("juncao"):
+            final_df = join_datasets(ck_df, metadata_df)
+            instrumentacao.contar(linhas=len(final_df))
 
         # Salva o dataset final
         final_output_path = os.path.join(PATH_TO_OUTPUT_FOLDER, FINAL_OUTPUT_FILE)
-        final_df.to_csv(final_output_path, index=False)
+        with instrumentacao.etapa("escrita"):
+            final_df.to_csv(final_output_path, index=False)
+            instrumentacao.contar(linhas=len(final_df), bytes_processados=os.path.getsize(final_output_path))
+
+        # Publica também em Arrow para que tabelas e gráficos o mapeiem em memória
+        with instrumentacao.etapa("publicacao_arrow"):
+            arrow_output_path = publicar_arrow(final_df, final_output_path)
 
         print("\n" + "="*80)
         print("SUCESSO!")
         print(f"O dataset final para análise foi salvo em:")
         print(f"'{final_output_path}'")
+        if arrow_output_path:
+            print(f"Versão Arrow (para leitura mapeada em memória): '{arrow_output_path}'")
         
         if len(final_df) > 0:
             print(f"Foram unificados com sucesso dados de {len(final_df)} repositórios.")
@@ -83,4 +109,7 @@ def merge_datasets_with_fix():
 
 
 if __name__ == "__main__":
-    merge_datasets_with_fix()
\ No newline at end of file
+    instrumentacao.configurar_por_argv()
+    with instrumentacao.etapa("juncao_datasets"):
+        merge_datasets_with_fix()
+    instrumentacao.salvar_relatorio()
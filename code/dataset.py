@@ -0,0 +1,78 @@
+import os
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow é opcional; sem ele, tudo continua a usar o CSV
+    pa = None
+    feather = None
+
+# No Windows, os.replace() falha enquanto outro processo tiver o ficheiro
+# Arrow mapeado em memória; a publicação tenta de novo durante este tempo.
+TENTATIVAS_SUBSTITUICAO = 10
+ESPERA_SUBSTITUICAO_S = 0.5
+
+
+def caminho_arrow(csv_path):
+    """
+    Caminho do ficheiro Arrow publicado ao lado do CSV.
+    """
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+
+def publicar_arrow(df, csv_path):
+    """
+    Publica o DataFrame como ficheiro Arrow IPC (Feather v2) sem compressão,
+    para que possa ser mapeado em memória. A escrita é feita num ficheiro
+    temporário seguido de os.replace(). Em POSIX, processos que já tenham o
+    ficheiro anterior mapeado continuam a ver a versão antiga. No Windows a
+    substituição é recusada enquanto houver um mapeamento aberto: tenta-se
+    de novo durante alguns segundos e, se o leitor não o libertar, o Arrow
+    não é atualizado (o CSV, mais recente, passa a ser o lido).
+    Devolve o caminho gravado, ou None se não foi possível publicar.
+    """
+    if feather is None:
+        print("AVISO: pyarrow não está instalado; o ficheiro Arrow não foi gerado.")
+        return None
+
+    destino = caminho_arrow(csv_path)
+    temporario = destino + ".tmp"
+    feather.write_feather(df, temporario, compression='uncompressed')
+    for tentativa in range(1, TENTATIVAS_SUBSTITUICAO + 1):
+        try:
+            os.replace(temporario, destino)
+            return destino
+        except PermissionError:
+            if tentativa == TENTATIVAS_SUBSTITUICAO:
+                break
+            time.sleep(ESPERA_SUBSTITUICAO_S)
+    os.remove(temporario)
+    print(f"AVISO: '{destino}' está em uso por outro processo e não foi atualizado; "
+          "será lido o CSV até à próxima publicação.")
+    return None
+
+
+def carregar_dataset(csv_path, copiar=False):
+    """
+    Carrega o dataset final. Se existir uma versão Arrow tão recente quanto
+    o CSV, ela é mapeada em memória: as colunas numéricas são partilhadas
+    com a cache de páginas do sistema (sem cópia e sem parsing), pelo que
+    vários workers podem abrir o mesmo ficheiro quase sem custo de memória.
+    O mapeamento dura enquanto o DataFrame existir; processos de longa
+    duração devem usar copiar=True, que lê o Arrow para memória própria e
+    fecha o ficheiro (senão, no Windows, impedem a próxima publicação).
+    Caso contrário, lê o CSV.
+    """
+    arrow_path = caminho_arrow(csv_path)
+    if pa is not None and os.path.exists(arrow_path) and (
+            not os.path.exists(csv_path) or os.path.getmtime(arrow_path) >= os.path.getmtime(csv_path)):
+        if copiar:
+            with pa.OSFile(arrow_path, 'rb') as fonte:
+                tabela = pa.ipc.open_file(fonte).read_all()
+            return tabela.to_pandas()
+        tabela = pa.ipc.open_file(pa.memory_map(arrow_path, 'r')).read_all()
+        return tabela.to_pandas(split_blocks=True, self_destruct=False)
+    return pd.read_csv(csv_path)
@@ -0,0 +1,256 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows não possui o módulo 'resource'
+    resource = None
+
+# --- CONFIGURE AQUI ---
+# A instrumentação fica desligada por padrão. Para a ativar, passe a flag
+# '--instrumentar' na linha de comando ou defina a variável de ambiente
+# INSTRUMENTAR=1. Para gerar um perfil cProfile de uma etapa específica,
+# use '--perfil=<nome_da_etapa>' ou INSTRUMENTAR_PERFIL=<nome_da_etapa>.
+# O perfil inclui as threads criadas durante a etapa (ex.: o ThreadPoolExecutor
+# da coleta); threads que já existiam antes dela não são perfiladas (para
+# essas, use um perfilador de amostragem como o py-spy).
+FLAG_INSTRUMENTAR = "--instrumentar"
+FLAG_PERFIL = "--perfil="
+
+# Nome do ficheiro JSON com o relatório da execução
+RELATORIO_SAIDA = "relatorio_execucao.json"
+# --- FIM DA CONFIGURAÇÃO ---
+
+_estado = {
+    'ativa': False,
+    'caminho_relatorio': RELATORIO_SAIDA,
+    'etapa_perfil': None,
+    'inicio': None,
+    'pilha': [],
+    'etapas': {},
+    'perfis': {},
+}
+# Os contadores podem ser atualizados por várias threads (ex.: coleta paralela)
+_lock = threading.Lock()
+
+
+def _rss_pico_mb():
+    """
+    Devolve o pico de memória residente (RSS) do processo em MB, ou None
+    se não for possível medi-lo nesta plataforma.
+    """
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # No macOS o valor vem em bytes; no Linux, em kilobytes.
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return round(pico / divisor, 2)
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, 'peak_wset', info.rss) / (1024 * 1024), 2)
+    except Exception:
+        return None
+
+
+def ativar(caminho_relatorio=None, etapa_perfil=None):
+    """
+    Liga a instrumentação para o processo atual.
+    """
+    _estado['ativa'] = True
+    _estado['inicio'] = datetime.now().isoformat(timespec='seconds')
+    if caminho_relatorio:
+        _estado['caminho_relatorio'] = caminho_relatorio
+    if etapa_perfil:
+        _estado['etapa_perfil'] = etapa_perfil
+
+
+def ativada():
+    return _estado['ativa']
+
+
+def reiniciar():
+    """
+    Desliga a instrumentação e descarta etapas e perfis acumulados (usado
+    por processos que executam vários pedidos, como o worker).
+    """
+    _estado.update(ativa=False, caminho_relatorio=RELATORIO_SAIDA, etapa_perfil=None,
+                   inicio=None, pilha=[], etapas={}, perfis={})
+
+
+def configurar_por_argv(argv=None):
+    """
+    Ativa a instrumentação se a flag '--instrumentar' (ou a variável de
+    ambiente INSTRUMENTAR) estiver presente. Remove as flags reconhecidas
+    de argv para não interferir com o restante do script.
+    """
+    argv = sys.argv if argv is None else argv
+    ativa = os.getenv("INSTRUMENTAR", "") not in ("", "0")
+    etapa_perfil = os.getenv("INSTRUMENTAR_PERFIL")
+    ativa = ativa or bool(etapa_perfil)
+
+    for arg in list(argv[1:]):
+        if arg == FLAG_INSTRUMENTAR:
+            ativa = True
+            argv.remove(arg)
+        elif arg.startswith(FLAG_PERFIL):
+            ativa = True
+            etapa_perfil = arg[len(FLAG_PERFIL):]
+            argv.remove(arg)
+
+    if ativa:
+        ativar(os.getenv("INSTRUMENTAR_RELATORIO"), etapa_perfil)
+    return ativa
+
+
+def _registro(nome):
+    if nome not in _estado['etapas']:
+        _estado['etapas'][nome] = {
+            'chamadas': 0,
+            'tempo_parede_s': 0.0,
+            'tempo_cpu_s': 0.0,
+            'rss_pico_mb': None,
+            'rss_pico_delta_mb': 0.0,
+            'linhas': 0,
+            'bytes': 0,
+            'requisicoes_http': 0,
+            'tentativas_http': 0,
+        }
+    return _estado['etapas'][nome]
+
+
+@contextmanager
+def etapa(nome):
+    """
+    Mede o tempo de parede, o tempo de CPU e o pico de RSS de um bloco.
+    Etapas aninhadas são registadas como 'pai/filho'; chamadas repetidas
+    à mesma etapa são acumuladas.
+    """
+    if not _estado['ativa']:
+        yield
+        return
+
+    pilha = _estado['pilha']
+    nome_completo = "/".join(pilha + [nome])
+    with _lock:
+        registro = _registro(nome_completo)
+    pilha.append(nome)
+
+    # Um perfil por thread e por etapa, acumulado em todas as chamadas e
+    # gravado (junto) por salvar_relatorio()
+    perfil = None
+    if _estado['etapa_perfil'] in (nome, nome_completo):
+        with _lock:
+            perfis = _estado['perfis'].setdefault(nome_completo, [cProfile.Profile()])
+            perfil = perfis[0]
+        threading.setprofile(_perfilar_thread(nome_completo))
+
+    rss_inicio = _rss_pico_mb()
+    inicio_parede = time.perf_counter()
+    inicio_cpu = time.process_time()
+    if perfil is not None:
+        perfil.enable()
+    try:
+        yield
+    finally:
+        if perfil is not None:
+            perfil.disable()
+            threading.setprofile(None)
+            registro['perfil'] = _caminho_perfil(nome_completo)
+        registro['chamadas'] += 1
+        registro['tempo_parede_s'] += time.perf_counter() - inicio_parede
+        registro['tempo_cpu_s'] += time.process_time() - inicio_cpu
+        rss_fim = _rss_pico_mb()
+        if rss_fim is not None:
+            registro['rss_pico_mb'] = rss_fim
+            registro['rss_pico_delta_mb'] += rss_fim - (rss_inicio or 0)
+        pilha.pop()
+
+
+def _caminho_perfil(nome_completo):
+    return f"perfil_{nome_completo.replace('/', '_')}.prof"
+
+
+def _perfilar_thread(nome_completo):
+    """
+    Gancho de threading.setprofile: cada thread criada durante a etapa
+    perfilada liga o seu próprio cProfile na primeira chamada.
+    """
+    def iniciar(frame, evento, arg):
+        sys.setprofile(None)
+        perfil = cProfile.Profile()
+        with _lock:
+            _estado['perfis'][nome_completo].append(perfil)
+        perfil.enable()
+    return iniciar
+
+
+def salvar_perfis():
+    """
+    Grava os perfis cProfile acumulados de cada etapa perfilada, juntando
+    os da thread principal e os das threads criadas durante a etapa.
+    """
+    caminhos = []
+    for nome_completo, perfis in _estado['perfis'].items():
+        estatisticas = pstats.Stats(perfis[0])
+        for perfil in perfis[1:]:
+            estatisticas.add(perfil)
+        caminho = _caminho_perfil(nome_completo)
+        estatisticas.dump_stats(caminho)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def contar(linhas=0, bytes_processados=0, requisicoes=0, tentativas=0):
+    """
+    Soma contadores à etapa atual (ou a uma etapa '(global)' quando
+    chamada fora de qualquer etapa).
+    """
+    if not _estado['ativa']:
+        return
+    nome = "/".join(_estado['pilha']) or "(global)"
+    with _lock:
+        registro = _registro(nome)
+        registro['linhas'] += linhas
+        registro['bytes'] += bytes_processados
+        registro['requisicoes_http'] += requisicoes
+        registro['tentativas_http'] += tentativas
+
+
+def gerar_relatorio():
+    etapas = {}
+    for nome, registro in _estado['etapas'].items():
+        etapas[nome] = dict(registro,
+                            tempo_parede_s=round(registro['tempo_parede_s'], 4),
+                            tempo_cpu_s=round(registro['tempo_cpu_s'], 4),
+                            rss_pico_delta_mb=round(registro['rss_pico_delta_mb'], 2))
+    return {
+        'script': os.path.basename(sys.argv[0]) if sys.argv else None,
+        'inicio': _estado['inicio'],
+        'fim': datetime.now().isoformat(timespec='seconds'),
+        'pid': os.getpid(),
+        'rss_pico_mb': _rss_pico_mb(),
+        'etapas': etapas,
+    }
+
+
+def salvar_relatorio(caminho=None):
+    """
+    Grava o relatório estruturado da execução em JSON. Não faz nada se a
+    instrumentação estiver desligada.
+    """
+    if not _estado['ativa']:
+        return None
+    for caminho_perfil in salvar_perfis():
+        print(f"Perfil cProfile guardado em: '{caminho_perfil}'")
+    caminho = caminho or _estado['caminho_relatorio']
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(gerar_relatorio(), f, indent=2, ensure_ascii=False)
+    print(f"Relatório de instrumentação guardado em: '{caminho}'")
+    return caminho
@@ -0,0 +1,78 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Balde de fichas clássico: acumula 'taxa' fichas por segundo até à
+    'capacidade' e cada requisição consome uma ficha.
+    """
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade if capacidade is not None else max(taxa, 1))
+        self.fichas = self.capacidade
+        self.atualizado_em = time.monotonic()
+        self.bloqueado_ate = 0.0
+
+    def _reabastecer(self, agora):
+        self.fichas = min(self.capacidade, self.fichas + (agora - self.atualizado_em) * self.taxa)
+        self.atualizado_em = agora
+
+    def tempo_ate_ficha(self, agora):
+        """
+        Segundos até haver uma ficha disponível (0 se já houver).
+        """
+        self._reabastecer(agora)
+        if agora < self.bloqueado_ate:
+            return self.bloqueado_ate - agora
+        if self.fichas >= 1:
+            return 0.0
+        return (1 - self.fichas) / self.taxa
+
+    def consumir(self):
+        self.fichas -= 1
+
+
+class OrcamentoDeRequisicoes:
+    """
+    Orçamento global de requisições partilhado por todas as threads da
+    coleta. Mantém um TokenBucket por token do GitHub e entrega sempre o
+    token que fica disponível mais cedo, de modo que várias buscas em
+    paralelo dividem o mesmo limite em vez de o multiplicarem.
+    """
+
+    def __init__(self, tokens_github, taxa_por_token, capacidade=None):
+        if not tokens_github:
+            raise ValueError("É necessário pelo menos um token do GitHub.")
+        self.baldes = {token: TokenBucket(taxa_por_token, capacidade) for token in tokens_github}
+        self.lock = threading.Lock()
+
+    def adquirir(self):
+        """
+        Bloqueia até haver orçamento e devolve o token do GitHub a usar.
+        """
+        while True:
+            with self.lock:
+                agora = time.monotonic()
+                espera, token = min((balde.tempo_ate_ficha(agora), token) for token, balde in self.baldes.items())
+                if espera <= 0:
+                    self.baldes[token].consumir()
+                    return token
+            time.sleep(espera)
+
+    def bloquear(self, token_github, segundos):
+        """
+        Suspende um token (ex.: após um 403 de limite) sem afetar os outros.
+        """
+        with self.lock:
+            balde = self.baldes[token_github]
+            balde.bloqueado_ate = max(balde.bloqueado_ate, time.monotonic() + segundos)
+
+    def atualizar_por_cabecalhos(self, token_github, cabecalhos):
+        """
+        Sincroniza com o limite primário informado pela API: se os pontos
+        do token se esgotaram, suspende-o até ao X-RateLimit-Reset.
+        """
+        if cabecalhos.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in cabecalhos:
+            self.bloquear(token_github, max(float(cabecalhos['X-RateLimit-Reset']) - time.time() + 1, 0))
@@ -1,19 +1,49 @@
+import argparse
 import requests
+import threading
 import time
 import os
 
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+import instrumentacao
+import snapshots
+from limite_requisicoes import OrcamentoDeRequisicoes
+
 # Pega o token de autenticação do GitHub diretamente das variáveis de ambiente
 # Certifique-se de definir a variável de ambiente TOKEN antes de executar.
 GITHUB_TOKEN = os.getenv("TOKEN")
-GITHUB_API_URL = 'https://api.github.com/graphql'
+# Opcionalmente, vários tokens separados por vírgula em TOKENS. O orçamento de
+# requisições é dividido entre eles.
+GITHUB_TOKENS = [t.strip() for t in os.getenv("TOKENS", "").split(",") if t.strip()] or \
+    ([GITHUB_TOKEN] if GITHUB_TOKEN else [])
+# GITHUB_API_URL pode ser sobrescrita para apontar para um servidor de teste
+# local (ver code/mock_github_server.py).
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", 'https://api.github.com/graphql')
+
+# Tentativas para respostas de limite de requisições (403/429) e falhas 5xx
+MAX_TENTATIVAS = 5
+ESPERA_MAXIMA_S = 60
+
+# Orçamento global de requisições (por token), partilhado por todas as
+# buscas em paralelo, e número de threads que buscam detalhes por linguagem
+REQUISICOES_POR_SEGUNDO = float(os.getenv("REQUISICOES_POR_SEGUNDO", 10))
+WORKERS_DETALHES = 8
+
+# Nome do ficheiro CSV gerado com os metadados dos repositórios
+METADATA_OUTPUT_FILE = 'metadata.csv'
+# Pasta com uma partição por linguagem quando várias são coletadas
+PARTITIONS_DIR = 'metadata_por_linguagem'
 
-# Query GraphQL para buscar os repositórios Java mais populares de forma paginada
+# Busca padrão; '{linguagem}' é substituído em cada especificação de busca
+DEFAULT_SEARCH_QUERY = "language:{linguagem} sort:stars-desc is:public"
+DEFAULT_LANGUAGES = ['Java']
+
+# Query GraphQL para buscar os repositórios mais populares de forma paginada
 GET_TOP_REPOS_PAGINATED_QUERY = """
-query GetTopJavaRepos($afterCursor: String) {
-  search(query: "language:Java sort:stars-desc is:public", type: REPOSITORY, first: 100, after: $afterCursor) {
+query GetTopRepos($searchQuery: String!, $afterCursor: String) {
+  search(query: $searchQuery, type: REPOSITORY, first: 100, after: $afterCursor) {
     nodes {
       ... on Repository {
         owner {
@@ -44,40 +74,108 @@ query GetRepoDetails($owner: String!, $name: String!) {
 }
 """
 
+_orcamento = None
+_orcamento_lock = threading.Lock()
+
+def obter_orcamento():
+    """
+    Devolve o orçamento global de requisições, criando-o na primeira chamada.
+    """
+    global _orcamento
+    with _orcamento_lock:
+        if _orcamento is None:
+            if not GITHUB_TOKENS:
+                raise Exception("Token do GitHub não encontrado. Configure a variável de ambiente TOKEN.")
+            _orcamento = OrcamentoDeRequisicoes(GITHUB_TOKENS, REQUISICOES_POR_SEGUNDO)
+        return _orcamento
+
 def run_graphql_query(query, variables=None):
     """
     Executa uma query GraphQL na API do GitHub.
     """
-    if not GITHUB_TOKEN:
-        raise Exception("Token do GitHub não encontrado. Configure a variável de ambiente TOKEN.")
+    orcamento = obter_orcamento()
+    request_body = {'query': query, 'variables': variables or {}}
 
-    headers = {
-        'Authorization': f'bearer {GITHUB_TOKEN}',
-        'Content-Type': 'application/json',
-    }
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        token = orcamento.adquirir()
+        headers = {
+            'Authorization': f'bearer {token}',
+            'Content-Type': 'application/json',
+        }
 
-    request_body = {'query': query, 'variables': variables or {}}
+        try:
+            response = requests.post(GITHUB_API_URL, headers=headers, json=request_body, timeout=60)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            # Falha de rede temporária: mesma espera exponencial das respostas 5xx
+            if tentativa == MAX_TENTATIVAS:
+                raise Exception(f"Query falhou após {MAX_TENTATIVAS} tentativas: {e}")
+            espera = min(2 ** (tentativa - 1), ESPERA_MAXIMA_S)
+            instrumentacao.contar(tentativas=1)
+            print(f"\n  - Aviso: Erro de ligação ({type(e).__name__}); nova tentativa em {espera:.1f}s "
+                  f"({tentativa}/{MAX_TENTATIVAS - 1})...")
+            time.sleep(espera)
+            continue
+
+        instrumentacao.contar(requisicoes=1, bytes_processados=len(response.content))
+        orcamento.atualizar_por_cabecalhos(token, response.headers)
+
+        if response.status_code == 200:
+            return response.json()
 
-    response = requests.post(GITHUB_API_URL, headers=headers, json=request_body, timeout=60)
+        if tentativa == MAX_TENTATIVAS or not _deve_tentar_novamente(response):
+            break
+
+        espera = _tempo_de_espera(response, tentativa)
+        instrumentacao.contar(tentativas=1)
+        print(f"\n  - Aviso: Resposta {response.status_code}; nova tentativa em {espera:.1f}s "
+              f"({tentativa}/{MAX_TENTATIVAS - 1})...")
+        if response.status_code in (403, 429):
+            # Limite de requisições: suspende só este token; os outros continuam.
+            orcamento.bloquear(token, espera)
+        else:
+            time.sleep(espera)
+
+    raise Exception(f"Query falhou com o código {response.status_code}:\n{response.text}")
+
+def _deve_tentar_novamente(response):
+    """
+    Indica se a resposta é um limite de requisições ou uma falha temporária.
+    """
+    if response.status_code in (429, 500, 502, 503, 504):
+        return True
+    if response.status_code == 403:
+        return ('Retry-After' in response.headers
+                or response.headers.get('X-RateLimit-Remaining') == '0'
+                or 'rate limit' in response.text.lower())
+    return False
 
-    if response.status_code == 200:
-        return response.json()
+def _tempo_de_espera(response, tentativa):
+    """
+    Calcula a espera antes da próxima tentativa, respeitando os cabeçalhos
+    Retry-After e X-RateLimit-Reset quando presentes.
+    """
+    if 'Retry-After' in response.headers:
+        espera = float(response.headers['Retry-After'])
+    elif response.headers.get('X-RateLimit-Remaining') == '0' and 'X-RateLimit-Reset' in response.headers:
+        espera = float(response.headers['X-RateLimit-Reset']) - time.time() + 1
     else:
-        raise Exception(f"Query falhou com o código {response.status_code}:\n{response.text}")
+        espera = 2 ** (tentativa - 1)
+    return min(max(espera, 0), ESPERA_MAXIMA_S)
 
-def get_all_top_repos(total_to_fetch=1000):
+def get_all_top_repos(total_to_fetch=1000, search_query=None, linguagem='Java'):
     """
     Busca repositórios em lotes de 100 até atingir o total desejado.
     """
     all_repo_nodes = []
     after_cursor = None
+    search_query = search_query or DEFAULT_SEARCH_QUERY.format(linguagem=linguagem)
 
-    print(f"Iniciando coleta de {total_to_fetch} repositórios Java (em lotes de 100)...")
+    print(f"[{linguagem}] Iniciando coleta de {total_to_fetch} repositórios (em lotes de 100)...")
 
     num_to_fetch = min(total_to_fetch, 1000)
 
     while len(all_repo_nodes) < num_to_fetch:
-        variables = {"afterCursor": after_cursor}
+        variables = {"searchQuery": search_query, "afterCursor": after_cursor}
         result = run_graphql_query(GET_TOP_REPOS_PAGINATED_QUERY, variables)
 
         if 'errors' in result:
@@ -88,27 +186,163 @@ def get_all_top_repos(total_to_fetch=1000):
         page_info = search_data['pageInfo']
 
         all_repo_nodes.extend(new_nodes)
+        instrumentacao.contar(linhas=len(new_nodes))
         after_cursor = page_info['endCursor']
 
-        progress = (len(all_repo_nodes) / num_to_fetch) * 100
-        print(f"\rColetados {len(all_repo_nodes)} de {num_to_fetch} repositórios ({progress:.1f}%)", end='', flush=True)
-
+        progress = (min(len(all_repo_nodes), num_to_fetch) / num_to_fetch) * 100
+        print(f"[{linguagem}] Coletados {min(len(all_repo_nodes), num_to_fetch)} de {num_to_fetch} repositórios ({progress:.1f}%)")
 
         if not page_info['hasNextPage']:
-            print("\nNão há mais páginas para buscar. Fim da coleta.")
+            print(f"[{linguagem}] Não há mais páginas para buscar. Fim da coleta.")
             break
 
-        time.sleep(0.2)  # Pausa para evitar limites da API
+    return all_repo_nodes[:num_to_fetch]
 
+def _buscar_detalhes_repo(repo):
+    owner = repo['owner']['login']
+    name = repo['name']
 
+    try:
+        result = run_graphql_query(GET_REPO_DETAILS_QUERY, {"owner": owner, "name": name})
 
-    print()
-    return all_repo_nodes[:num_to_fetch]
+        if 'errors' in result:
+            print(f"  - Aviso: Erro ao buscar '{owner}/{name}': {result['errors']}")
+            return None
 
-def get_repo_details(repo_list):
-    """
-    Busca os detalhes para cada repositório da lista.
+        repo_info = result['data']['repository']
+        created_at = datetime.strptime(repo_info['createdAt'], "%Y-%m-%dT%H:%M:%SZ")
+        maturidade_anos = (datetime.now() - created_at).days / 365.25
+
+        instrumentacao.contar(linhas=1)
+        return {
+            'nameWithOwner': repo_info['nameWithOwner'],
+            'popularidade_estrelas': repo_info['stargazerCount'],
+            'atividade_releases': repo_info['releases']['totalCount'],
+            'maturidade_anos': round(maturidade_anos, 2),
+        }
+    except Exception as e:
+        print(f"  - ERRO: Não foi possível buscar '{owner}/{name}'. Erro: {e}")
+        return None
 
+def get_repo_details(repo_list, linguagem='Java', workers=WORKERS_DETALHES):
+    """
+    Busca os detalhes para cada repositório da lista. As requisições correm
+    em paralelo; o ritmo é controlado pelo orçamento global de requisições.
     """
-    all_repo_data = []
     total_repos = len(repo_list)
+
+    print(f"[{linguagem}] Buscando detalhes de {total_repos} repositórios...")
+
+    all_repo_data = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for i, repo_data in enumerate(executor.map(_buscar_detalhes_repo, repo_list)):
+            if repo_data is not None:
+                all_repo_data.append(repo_data)
+
+            if (i + 1) % 100 == 0 or i + 1 == total_repos:
+                progress = ((i + 1) / total_repos) * 100
+                print(f"[{linguagem}] Detalhes obtidos: {i + 1} de {total_repos} ({progress:.1f}%)")
+
+    return all_repo_data
+
+def criar_specs(linguagens=None, total_to_fetch=1000):
+    """
+    Cria uma especificação de busca por linguagem.
+    """
+    return [
+        {
+            'linguagem': linguagem,
+            'query': DEFAULT_SEARCH_QUERY.format(linguagem=linguagem),
+            'total': total_to_fetch,
+        }
+        for linguagem in (linguagens or DEFAULT_LANGUAGES)
+    ]
+
+def coletar_spec(spec):
+    """
+    Executa uma especificação de busca: lista os repositórios e busca os
+    detalhes de cada um.
+    """
+    repos = get_all_top_repos(spec['total'], spec['query'], spec['linguagem'])
+    return get_repo_details(repos, spec['linguagem'])
+
+def caminho_particao(linguagem):
+    return os.path.join(PARTITIONS_DIR, f"linguagem={linguagem}", METADATA_OUTPUT_FILE)
+
+def coletar_metadados(specs=None, output_file=METADATA_OUTPUT_FILE, pasta_saida=None,
+                      caminho_db=snapshots.SNAPSHOT_DB):
+    """
+    Executa a coleta completa e guarda os metadados dos repositórios em CSV.
+    Com várias especificações, todas correm em simultâneo sob o mesmo
+    orçamento de requisições e cada uma é gravada na sua partição. Uma
+    linguagem que falhe não impede a gravação das restantes; devolve
+    {linguagem: erro} das que falharam. 'pasta_saida' e 'caminho_db'
+    permitem gravar os CSVs e o histórico fora da pasta atual (ex.: nos
+    testes com o servidor de teste).
+    """
+    # Importado aqui para que o CLI não pague o custo do pandas ao arrancar
+    import pandas as pd
+
+    specs = specs or criar_specs()
+    # metadata.csv guarda só a série padrão (Java); qualquer outra linguagem,
+    # mesmo sozinha, vai para a sua partição para não misturar séries.
+    particionar = len(specs) > 1 or specs[0]['linguagem'] not in DEFAULT_LANGUAGES
+
+    def destino(spec):
+        caminho = caminho_particao(spec['linguagem']) if particionar else output_file
+        return os.path.join(pasta_saida, caminho) if pasta_saida else caminho
+
+    with instrumentacao.etapa("coleta"):
+        with instrumentacao.etapa("busca_e_detalhes"):
+            with ThreadPoolExecutor(max_workers=len(specs)) as executor:
+                futuros = [(spec, executor.submit(coletar_spec, spec)) for spec in specs]
+                resultados, falhas = [], {}
+                for spec, futuro in futuros:
+                    try:
+                        resultados.append((spec, futuro.result()))
+                    except Exception as e:
+                        falhas[spec['linguagem']] = e
+                        print(f"[{spec['linguagem']}] ERRO: A coleta falhou: {e}")
+
+        with instrumentacao.etapa("escrita_csv"):
+            for spec, repo_data in resultados:
+                caminho = destino(spec)
+                if os.path.dirname(caminho):
+                    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+
+                df = pd.DataFrame(repo_data)
+                df.to_csv(caminho, index=False)
+                instrumentacao.contar(linhas=len(df), bytes_processados=os.path.getsize(caminho))
+                print(f"[{spec['linguagem']}] Metadados de {len(df)} repositórios guardados em: '{caminho}'")
+
+        # Guarda a coleta como nova versão no histórico, em vez de perder a anterior
+        with instrumentacao.etapa("snapshot"):
+            if os.path.dirname(caminho_db):
+                os.makedirs(os.path.dirname(caminho_db), exist_ok=True)
+            for spec, _ in resultados:
+                versao, alteracoes = snapshots.registrar_snapshot(destino(spec), serie=spec['linguagem'],
+                                                                  caminho_db=caminho_db)
+                print(f"[{spec['linguagem']}] Versão {versao} do histórico registada ({alteracoes} campos alterados).")
+
+    if falhas:
+        print(f"AVISO: {len(falhas)} de {len(specs)} linguagens falharam e não foram gravadas: "
+              f"{', '.join(falhas)}.")
+    return falhas
+
+
+if __name__ == "__main__":
+    instrumentacao.configurar_por_argv()
+
+    parser = argparse.ArgumentParser(description="Coleta metadados dos repositórios mais populares do GitHub.")
+    parser.add_argument('--linguagens', nargs='+', default=DEFAULT_LANGUAGES,
+                        help="linguagens a coletar em simultâneo (ex.: Java Kotlin Scala Groovy)")
+    parser.add_argument('--total', type=int, default=1000, help="repositórios por linguagem (máx. 1000)")
+    parser.add_argument('--saida', help="pasta onde gravar os CSVs (por padrão, a pasta atual)")
+    parser.add_argument('--db', default=snapshots.SNAPSHOT_DB, help="base SQLite do histórico de coletas")
+    args = parser.parse_args()
+
+    falhas = coletar_metadados(criar_specs(args.linguagens, args.total), pasta_saida=args.saida,
+                               caminho_db=args.db)
+    instrumentacao.salvar_relatorio()
+    if falhas:
+        raise SystemExit(1)
@@ -0,0 +1,312 @@
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+# --- CONFIGURE AQUI ---
+# Servidor local que imita a API GraphQL do GitHub para testes de carga da
+# coleta (code/main.py) sem token e sem rede. Para apontar o coletor para
+# ele, defina GITHUB_API_URL=http://127.0.0.1:8765/graphql antes de executar,
+# e use --saida/--db numa pasta temporária: sem elas, a coleta de teste
+# substitui o metadata.csv (que é também a fixture deste servidor) e regista
+# uma versão falsa em snapshots.sqlite.
+# As fixtures são usadas para a linguagem Java; para outras linguagens
+# ('language:Kotlin', ...) o servidor devolve cópias com o sufixo '-kotlin'.
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Ficheiro com os repositórios usados como dados de teste
+FIXTURE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'metadata.csv')
+
+# Comportamento padrão (todos podem ser alterados pela linha de comando)
+LATENCIA_MS = 0              # Latência base de cada resposta
+JITTER_MS = 0                # Variação aleatória somada à latência
+LIMITE_PONTOS = 5000         # Pontos disponíveis por janela (X-RateLimit-Limit)
+JANELA_LIMITE_S = 3600       # Duração da janela do limite primário
+TAXA_LIMITE_SECUNDARIO = 0.0 # Probabilidade de responder 403 de limite secundário
+TAXA_FALHA_5XX = 0.0         # Probabilidade de responder 502/503
+RETRY_AFTER_S = 1            # Valor do cabeçalho Retry-After nos 403 secundários
+SEMENTE = 42
+# --- FIM DA CONFIGURAÇÃO ---
+
+
+def carregar_fixtures(caminho=FIXTURE_FILE):
+    """
+    Lê os repositórios de teste e converte-os para o formato devolvido
+    pela API do GitHub, ordenados por estrelas (como em 'sort:stars-desc').
+    """
+    df = pd.read_csv(caminho, engine='python', on_bad_lines='warn')
+    df = df.sort_values('popularidade_estrelas', ascending=False)
+    agora = datetime.now()
+
+    repos = []
+    for row in df.itertuples(index=False):
+        owner, name = row.nameWithOwner.split('/', 1)
+        created_at = agora - timedelta(days=float(row.maturidade_anos) * 365.25)
+        repos.append({
+            'owner': owner,
+            'name': name,
+            'nameWithOwner': row.nameWithOwner,
+            'createdAt': created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'stargazerCount': int(row.popularidade_estrelas),
+            'releases': int(row.atividade_releases),
+        })
+    return repos
+
+
+def _codificar_cursor(posicao):
+    return base64.b64encode(f"cursor:{posicao}".encode()).decode()
+
+
+def _decodificar_cursor(cursor):
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(':', 1)[1])
+
+
+def derivar_repos(repos, linguagem):
+    """
+    Cria os repositórios de teste de outra linguagem a partir das fixtures.
+    """
+    if linguagem.lower() == 'java':
+        return repos
+    sufixo = f"-{linguagem.lower()}"
+    return [
+        dict(r, name=r['name'] + sufixo, nameWithOwner=r['nameWithOwner'] + sufixo)
+        for r in repos
+    ]
+
+
+class EstadoServidor:
+    """
+    Dados de teste, configuração das falhas e contadores do limite de
+    requisições, partilhados entre as threads do servidor.
+    """
+
+    def __init__(self, repos, config):
+        self.repos = repos
+        self.repos_por_linguagem = {}
+        self.repos_por_nome = {(r['owner'].lower(), r['name'].lower()): r for r in repos}
+        self.config = config
+        self.random = random.Random(config.semente)
+        self.lock = threading.Lock()
+        self.pontos_usados = 0
+        self.reset_em = time.time() + config.janela
+        self.estatisticas = {'requisicoes': 0, 'limite_primario': 0, 'limite_secundario': 0, 'falhas_5xx': 0}
+
+    def repos_da_linguagem(self, linguagem):
+        with self.lock:
+            if linguagem not in self.repos_por_linguagem:
+                derivados = derivar_repos(self.repos, linguagem)
+                self.repos_por_linguagem[linguagem] = derivados
+                self.repos_por_nome.update({(r['owner'].lower(), r['name'].lower()): r for r in derivados})
+            return self.repos_por_linguagem[linguagem]
+
+    def sortear(self, probabilidade, contador=None):
+        """
+        Sorteia uma falha com a probabilidade dada; se ocorrer, incrementa o
+        contador indicado das estatísticas, sob o mesmo lock.
+        """
+        with self.lock:
+            ocorreu = self.random.random() < probabilidade
+            if ocorreu and contador:
+                self.estatisticas[contador] += 1
+            return ocorreu
+
+    def uniforme(self, a, b):
+        with self.lock:
+            return self.random.uniform(a, b)
+
+    def escolher(self, opcoes):
+        with self.lock:
+            return self.random.choice(opcoes)
+
+    def consumir_ponto(self):
+        """
+        Consome um ponto do limite primário. Devolve (permitido, restantes, reset).
+        """
+        with self.lock:
+            self.estatisticas['requisicoes'] += 1
+            agora = time.time()
+            if agora >= self.reset_em:
+                self.pontos_usados = 0
+                self.reset_em = agora + self.config.janela
+            if self.pontos_usados >= self.config.limite:
+                self.estatisticas['limite_primario'] += 1
+                return False, 0, int(self.reset_em)
+            self.pontos_usados += 1
+            return True, self.config.limite - self.pontos_usados, int(self.reset_em)
+
+
+def resolver_busca(estado, variables):
+    busca = re.search(r'language:(\S+)', variables.get('searchQuery') or 'language:Java')
+    repos = estado.repos_da_linguagem(busca.group(1) if busca else 'Java')
+    inicio = _decodificar_cursor(variables.get('afterCursor'))
+    fim = min(inicio + 100, len(repos))
+    nodes = [{'owner': {'login': r['owner']}, 'name': r['name']} for r in repos[inicio:fim]]
+    return {
+        'search': {
+            'nodes': nodes,
+            'pageInfo': {
+                'endCursor': _codificar_cursor(fim) if nodes else None,
+                'hasNextPage': fim < len(repos),
+            },
+        }
+    }
+
+
+def resolver_detalhes(estado, variables):
+    repo = estado.repos_por_nome.get((variables.get('owner', '').lower(), variables.get('name', '').lower()))
+    if repo is None:
+        return None
+    return {
+        'repository': {
+            'nameWithOwner': repo['nameWithOwner'],
+            'createdAt': repo['createdAt'],
+            'releases': {'totalCount': repo['releases']},
+            'stargazerCount': repo['stargazerCount'],
+        }
+    }
+
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    estado = None
+
+    def log_message(self, format, *args):
+        if not self.estado.config.silencioso:
+            super().log_message(format, *args)
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        for chave, valor in (cabecalhos or {}).items():
+            self.send_header(chave, str(valor))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        estado = self.estado
+        config = estado.config
+
+        # O corpo é lido antes de qualquer resposta: fechar a ligação com dados
+        # por ler faz o cliente receber um RST em vez do código injetado.
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            tamanho = 0
+        bruto = self.rfile.read(tamanho) if tamanho > 0 else b''
+
+        if config.latencia or config.jitter:
+            time.sleep((config.latencia + estado.uniforme(0, config.jitter)) / 1000)
+
+        if estado.sortear(config.taxa_5xx, 'falhas_5xx'):
+            self._responder(estado.escolher([502, 503]), {'message': 'Server Error'})
+            return
+
+        if estado.sortear(config.taxa_secundario, 'limite_secundario'):
+            self._responder(403, {
+                'message': 'You have exceeded a secondary rate limit. Please wait a few minutes before you try again.',
+            }, {'Retry-After': config.retry_after})
+            return
+
+        permitido, restantes, reset = estado.consumir_ponto()
+        cabecalhos = {
+            'X-RateLimit-Limit': config.limite,
+            'X-RateLimit-Remaining': restantes,
+            'X-RateLimit-Reset': reset,
+            'X-RateLimit-Used': config.limite - restantes,
+            'X-RateLimit-Resource': 'graphql',
+        }
+        if not permitido:
+            self._responder(403, {'message': 'API rate limit exceeded'}, cabecalhos)
+            return
+
+        try:
+            corpo = json.loads(bruto or b'{}')
+        except ValueError:
+            self._responder(400, {'message': 'Problems parsing JSON'}, cabecalhos)
+            return
+
+        query = corpo.get('query', '')
+        variables = corpo.get('variables') or {}
+
+        if 'search(' in query:
+            dados = resolver_busca(estado, variables)
+        elif 'repository(' in query:
+            dados = resolver_detalhes(estado, variables)
+            if dados is None:
+                self._responder(200, {
+                    'data': {'repository': None},
+                    'errors': [{'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository.'}],
+                }, cabecalhos)
+                return
+        else:
+            self._responder(200, {'errors': [{'message': 'Query não suportada pelo servidor de teste.'}]}, cabecalhos)
+            return
+
+        self._responder(200, {'data': dados}, cabecalhos)
+
+
+class ServidorTeste(ThreadingHTTPServer):
+    # A fila padrão (5) transborda com coletas concorrentes e o cliente
+    # recebe RSTs que não foram injetados
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def criar_servidor(config, repos=None):
+    """
+    Cria (sem iniciar) o servidor de teste. Útil para o usar numa thread
+    dentro de um benchmark.
+    """
+    estado = EstadoServidor(repos if repos is not None else carregar_fixtures(config.fixtures), config)
+    handler = type('Handler', (MockGitHubHandler,), {'estado': estado})
+    servidor = ServidorTeste((config.host, config.port), handler)
+    servidor.estado = estado
+    return servidor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor GraphQL local que imita a API do GitHub.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--fixtures', default=FIXTURE_FILE, help="CSV no formato de metadata.csv")
+    parser.add_argument('--latencia', type=float, default=LATENCIA_MS, help="latência base em ms")
+    parser.add_argument('--jitter', type=float, default=JITTER_MS, help="variação aleatória da latência em ms")
+    parser.add_argument('--limite', type=int, default=LIMITE_PONTOS, help="pontos por janela do limite primário")
+    parser.add_argument('--janela', type=float, default=JANELA_LIMITE_S, help="duração da janela em segundos")
+    parser.add_argument('--taxa-secundario', type=float, default=TAXA_LIMITE_SECUNDARIO,
+                        help="probabilidade de um 403 de limite secundário")
+    parser.add_argument('--taxa-5xx', type=float, default=TAXA_FALHA_5XX, help="probabilidade de um 502/503")
+    parser.add_argument('--retry-after', type=int, default=RETRY_AFTER_S)
+    parser.add_argument('--semente', type=int, default=SEMENTE)
+    parser.add_argument('--silencioso', action='store_true', help="não registar cada requisição")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    config = parse_args()
+    servidor = criar_servidor(config)
+    print(f"Servidor de teste com {len(servidor.estado.repos)} repositórios em "
+          f"http://{config.host}:{config.port}/graphql")
+    pasta_teste = os.path.join(tempfile.gettempdir(), 'coleta_mock')
+    print(f"Use: GITHUB_API_URL=http://{config.host}:{config.port}/graphql TOKEN=teste "
+          f"python code/main.py --saida {pasta_teste} --db {os.path.join(pasta_teste, 'snapshots.sqlite')}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        print(f"\nEstatísticas: {servidor.estado.estatisticas}")
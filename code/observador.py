@@ -0,0 +1,223 @@
+import argparse
+import os
+import threading
+import time
+
+import pandas as pd
+
+import consolidate_results
+import reports_generator
+import tables_generator
+from dataset import publicar_arrow
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog é opcional; sem ele usa-se apenas polling
+    Observer = None
+    FileSystemEventHandler = object
+
+# --- CONFIGURE AQUI ---
+# Intervalo entre varrimentos da pasta (com watchdog/inotify disponível, os
+# eventos acordam o observador antes do fim do intervalo).
+INTERVALO_POLLING_S = 5.0
+# Tempo sem novas alterações antes de processar um lote; também garante que o
+# CK já terminou de escrever o ficheiro.
+DEBOUNCE_S = 3.0
+# --- FIM DA CONFIGURAÇÃO ---
+
+SUFIXO_CLASSES = "class.csv"
+
+
+class _Despertador(FileSystemEventHandler):
+    """
+    Recebe os eventos do watchdog e acorda o ciclo de varrimento.
+    """
+
+    def __init__(self, evento):
+        self.evento = evento
+
+    def on_any_event(self, event):
+        if str(event.src_path).endswith(SUFIXO_CLASSES) or str(getattr(event, 'dest_path', '')).endswith(SUFIXO_CLASSES):
+            self.evento.set()
+
+
+class ObservadorCK:
+    """
+    Mantém em memória o resumo por repositório, os metadados e o dataset
+    final, e atualiza apenas as linhas dos repositórios cujos ficheiros
+    '*class.csv' mudaram.
+    """
+
+    def __init__(self, pasta, intervalo=INTERVALO_POLLING_S, debounce=DEBOUNCE_S):
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.debounce = debounce
+        self.assinaturas = {}
+        self.resumos = {}
+        self.metadata_df = None
+        self.metadata_mtime = None
+        self.final_df = None
+        self.acordar = threading.Event()
+
+        self.summary_path = os.path.join(pasta, consolidate_results.CK_SUMMARY_FILE)
+        self.metadata_path = os.path.join(pasta, consolidate_results.METADATA_FILE)
+        self.final_path = os.path.join(pasta, consolidate_results.FINAL_OUTPUT_FILE)
+
+    def varrer(self):
+        """
+        Devolve {ficheiro: (mtime_ns, tamanho)} dos ficheiros de classes.
+        """
+        assinaturas = {}
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(SUFIXO_CLASSES) and entrada.is_file():
+                    info = entrada.stat()
+                    assinaturas[entrada.name] = (info.st_mtime_ns, info.st_size)
+        return assinaturas
+
+    def carregar_estado_inicial(self):
+        """
+        Reaproveita o resumo já existente: só os ficheiros sem linha no resumo
+        ou mais recentes do que ele são processados no primeiro lote. Linhas
+        do resumo cujo ficheiro de classes já não existe (apagado com o
+        observador parado) entram no primeiro lote como removidas.
+        """
+        assinaturas = self.varrer()
+        if os.path.exists(self.summary_path):
+            resumo_mtime = os.stat(self.summary_path).st_mtime_ns
+            for registro in pd.read_csv(self.summary_path).to_dict('records'):
+                self.resumos[registro['repository']] = registro
+            for nome, assinatura in assinaturas.items():
+                repo = nome[:-len(SUFIXO_CLASSES)]
+                if repo in self.resumos and assinatura[0] <= resumo_mtime:
+                    self.assinaturas[nome] = assinatura
+            for repo in self.resumos:
+                nome = f"{repo}{SUFIXO_CLASSES}"
+                if nome not in assinaturas:
+                    self.assinaturas[nome] = (0, 0)
+        return assinaturas
+
+    def _carregar_metadados(self):
+        if not os.path.exists(self.metadata_path):
+            return False
+        mtime = os.stat(self.metadata_path).st_mtime_ns
+        if mtime != self.metadata_mtime:
+            self.metadata_df = pd.read_csv(self.metadata_path, engine='python', on_bad_lines='warn')
+            self.metadata_mtime = mtime
+            self.final_df = None  # metadados novos: refaz a junção completa
+        return True
+
+    def processar(self, alterados, removidos):
+        """
+        Recalcula o resumo dos repositórios afetados, atualiza as linhas
+        correspondentes do dataset final e refaz as tabelas das RQs.
+        """
+        afetados = set()
+        for nome in alterados:
+            repo = nome[:-len(SUFIXO_CLASSES)]
+            afetados.add(repo)
+            try:
+                df = pd.read_csv(os.path.join(self.pasta, nome))
+            except Exception as e:
+                print(f"  - ERRO: Não foi possível ler '{nome}'. Erro: {e}")
+                self.resumos.pop(repo, None)
+                continue
+            resumo = reports_generator.summarize_repository(repo, df) if not df.empty else None
+            if resumo is None:
+                print(f"  - Aviso: '{nome}' está vazio ou sem as colunas de métricas. A ignorar.")
+                self.resumos.pop(repo, None)
+            else:
+                self.resumos[repo] = resumo
+                print(f"  - Atualizado: {nome} ({len(df)} linhas)")
+        for nome in removidos:
+            repo = nome[:-len(SUFIXO_CLASSES)]
+            afetados.add(repo)
+            self.resumos.pop(repo, None)
+            print(f"  - Removido: {nome}")
+
+        summary_df = pd.DataFrame(list(self.resumos.values()))
+        summary_df.to_csv(self.summary_path, index=False)
+
+        if not self._carregar_metadados() or summary_df.empty:
+            print(f"AVISO: '{consolidate_results.METADATA_FILE}' não encontrado ou resumo vazio; "
+                  "o dataset final não foi atualizado.")
+            return
+
+        if self.final_df is None:
+            self.final_df = consolidate_results.join_datasets(summary_df, self.metadata_df)
+        else:
+            parciais = summary_df[summary_df['repository'].isin(afetados)]
+            novas_linhas = consolidate_results.join_datasets(parciais, self.metadata_df)
+            mantidas = self.final_df[~self.final_df['repository'].isin(afetados)]
+            self.final_df = pd.concat([mantidas, novas_linhas], ignore_index=True)
+
+        self.final_df.to_csv(self.final_path, index=False)
+        publicar_arrow(self.final_df, self.final_path)
+
+        try:
+            tables_generator.guardar_tabela_resumo(tables_generator.calcular_tabela_resumo(self.final_df))
+        except Exception as e:
+            print(f"  - Aviso: Não foi possível atualizar as tabelas das RQs. Erro: {e}")
+
+        print(f"Resultados parciais: {len(self.resumos)} repositórios resumidos, "
+              f"{len(self.final_df)} no dataset final.")
+
+    def observar(self, uma_vez=False):
+        """
+        Ciclo principal: varre a pasta, agrupa as alterações até passarem
+        'debounce' segundos sem novidades e então processa o lote.
+        """
+        pendentes = self.carregar_estado_inicial()
+        ultima_mudanca = time.monotonic() - self.debounce
+
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_Despertador(self.acordar), self.pasta, recursive=False)
+            observer.start()
+            print(f"A observar '{self.pasta}' (inotify/watchdog + polling a cada {self.intervalo}s)...")
+        else:
+            print(f"A observar '{self.pasta}' (polling a cada {self.intervalo}s)...")
+
+        try:
+            while True:
+                atual = self.varrer()
+                if atual != pendentes:
+                    pendentes = atual
+                    ultima_mudanca = time.monotonic()
+
+                if pendentes != self.assinaturas and time.monotonic() - ultima_mudanca >= self.debounce:
+                    alterados = [n for n, a in pendentes.items() if self.assinaturas.get(n) != a]
+                    removidos = [n for n in self.assinaturas if n not in pendentes]
+                    print(f"\nLote com {len(alterados)} ficheiros novos/alterados e {len(removidos)} removidos.")
+                    self.processar(alterados, removidos)
+                    self.assinaturas = pendentes
+                    if uma_vez:
+                        break
+                elif uma_vez and pendentes == self.assinaturas:
+                    break
+
+                espera = self.intervalo
+                if pendentes != self.assinaturas:
+                    espera = min(espera, max(self.debounce - (time.monotonic() - ultima_mudanca), 0.1))
+                self.acordar.wait(espera)
+                self.acordar.clear()
+        except KeyboardInterrupt:
+            print("\nObservação terminada.")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Atualiza resumos, dataset final e tabelas à medida que o CK produz resultados.")
+    parser.add_argument('--pasta', default=reports_generator.PATH_TO_OUTPUT_FOLDER)
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_POLLING_S)
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_S)
+    parser.add_argument('--uma-vez', action='store_true', help="processa as alterações pendentes e termina")
+    args = parser.parse_args()
+
+    ObservadorCK(args.pasta, args.intervalo, args.debounce).observar(args.uma_vez)
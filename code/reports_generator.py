@@ -1,13 +1,48 @@
 import os
 import pandas as pd
 
+import instrumentacao
+from amostragem import AmostradorEstratificado, amostra_ponderada
+
 # --- CONFIGURE AQUI ---
 # Confirme se este é o caminho para a pasta que contém todos os seus
 # ficheiros .csv (ex: vhrclass.csv, vespaclass.csv, etc.).
 PATH_TO_OUTPUT_FOLDER = r"C:\Users\TI04\ResultadosCK"
+
+# Amostragem de classes feita durante a leitura (ver amostragem.py):
+# semente, tamanho de cada reservatório por repositório/estrato e tamanho
+# da amostra exportada para o gráfico de dispersão LOC vs. CBO.
+SEMENTE_AMOSTRAGEM = 42
+TAMANHO_RESERVATORIO = 100
+TAMANHO_AMOSTRA_SCATTER = 400
 # --- FIM DA CONFIGURAÇÃO ---
 
 
+METRIC_COLS = ['cbo', 'dit', 'lcom', 'loc']
+
+
+def summarize_repository(repo_name, df):
+    """
+    Calcula as métricas de resumo de um repositório a partir das suas
+    classes. Devolve None se faltar alguma coluna de métricas.
+    """
+    if not all(col in df.columns for col in METRIC_COLS):
+        return None
+
+    summary = {'repository': repo_name}
+    summary['total_loc'] = df['loc'].sum()
+    summary['cbo_mean'] = df['cbo'].mean()
+    summary['cbo_median'] = df['cbo'].median()
+    summary['cbo_std'] = df['cbo'].std()
+    summary['dit_mean'] = df['dit'].mean()
+    summary['dit_median'] = df['dit'].median()
+    summary['dit_std'] = df['dit'].std()
+    summary['lcom_mean'] = df['lcom'].mean()
+    summary['lcom_median'] = df['lcom'].median()
+    summary['lcom_std'] = df['lcom'].std()
+    return summary
+
+
 def consolidate_and_summarize_metrics():
     """
     Procura por ficheiros que terminam com 'class.csv' numa única pasta,
@@ -17,6 +52,7 @@ def consolidate_and_summarize_metrics():
     """
     all_metrics_dfs = []
     summary_data = []
+    amostrador = AmostradorEstratificado(TAMANHO_RESERVATORIO, SEMENTE_AMOSTRAGEM)
     
     print(f"Iniciando a busca por ficheiros que terminam com 'class.csv' em: '{PATH_TO_OUTPUT_FOLDER}'...")
 
@@ -40,31 +76,26 @@ def consolidate_and_summarize_metrics():
         repo_name = filename.replace("class.csv", "")
 
         try:
-            df = pd.read_csv(file_path)
+            with instrumentacao.etapa("leitura_classes"):
+                df = pd.read_csv(file_path)
+                instrumentacao.contar(linhas=len(df), bytes_processados=os.path.getsize(file_path))
             
             if df.empty:
                 print(f"  - Aviso: Ficheiro '{filename}' está vazio. A ignorar.")
                 continue
             
             # Calcula as métricas de resumo para o repositório
-            summary = {'repository': repo_name}
-            metric_cols = ['cbo', 'dit', 'lcom', 'loc']
+            summary = summarize_repository(repo_name, df)
             
-            if all(col in df.columns for col in metric_cols):
-                summary['total_loc'] = df['loc'].sum()
-                summary['cbo_mean'] = df['cbo'].mean()
-                summary['cbo_median'] = df['cbo'].median()
-                summary['cbo_std'] = df['cbo'].std()
-                summary['dit_mean'] = df['dit'].mean()
-                summary['dit_median'] = df['dit'].median()
-                summary['dit_std'] = df['dit'].std()
-                summary['lcom_mean'] = df['lcom'].mean()
-                summary['lcom_median'] = df['lcom'].median()
-                summary['lcom_std'] = df['lcom'].std()
+            if summary is not None:
                 summary_data.append(summary)
             else:
                 print(f"  - Aviso: Uma ou mais colunas de métricas (cbo, dit, lcom, loc) não foram encontradas em '{filename}'. A ignorar para o resumo.")
 
+            # Atualiza os reservatórios de amostragem com as classes deste repositório
+            with instrumentacao.etapa("amostragem"):
+                amostrador.adicionar(repo_name, df)
+
             # Adiciona a coluna do repositório para a consolidação geral
             df['repository'] = repo_name
             all_metrics_dfs.append(df)
@@ -80,7 +111,9 @@ def consolidate_and_summarize_metrics():
         final_df = pd.concat(all_metrics_dfs, ignore_index=True)
         final_output_path = os.path.join(PATH_TO_OUTPUT_FOLDER, "consolidated_metrics.csv")
         
-        final_df.to_csv(final_output_path, index=False)
+        with instrumentacao.etapa("escrita_consolidado"):
+            final_df.to_csv(final_output_path, index=False)
+            instrumentacao.contar(linhas=len(final_df), bytes_processados=os.path.getsize(final_output_path))
         
         print("\n" + "="*80)
         print("SUCESSO! (Consolidação Geral)")
@@ -94,7 +127,9 @@ def consolidate_and_summarize_metrics():
     if summary_data:
         summary_df = pd.DataFrame(summary_data)
         summary_output_path = os.path.join(PATH_TO_OUTPUT_FOLDER, "summary_metrics_por_repositorio.csv")
-        summary_df.to_csv(summary_output_path, index=False)
+        with instrumentacao.etapa("escrita_resumo"):
+            summary_df.to_csv(summary_output_path, index=False)
+            instrumentacao.contar(linhas=len(summary_df), bytes_processados=os.path.getsize(summary_output_path))
         
         print("\n" + "="*80)
         print("SUCESSO! (Resumo de Métricas por Repositório)")
@@ -103,7 +138,28 @@ def consolidate_and_summarize_metrics():
     else:
         print("\nAVISO: Nenhum dado foi processado para o ficheiro de resumo.")
 
+    # Guarda os reservatórios e a amostra usada no gráfico de dispersão
+    reservatorios_df = amostrador.amostra()
+    if not reservatorios_df.empty:
+        reservatorios_path = os.path.join(PATH_TO_OUTPUT_FOLDER, "amostra_classes.csv")
+        reservatorios_df.to_csv(reservatorios_path, index=False)
+
+        # O gráfico só usa classes com ambos os valores (exclui o estrato 'Sem valor')
+        pares_df = reservatorios_df.dropna(subset=['loc', 'cbo'])
+        scatter_df = amostra_ponderada(pares_df, TAMANHO_AMOSTRA_SCATTER, SEMENTE_AMOSTRAGEM)[['loc', 'cbo']]
+        scatter_path = os.path.join(PATH_TO_OUTPUT_FOLDER, "scatter_loc_vs_cbo.csv")
+        scatter_df.to_csv(scatter_path, index=False)
+
+        print("\n" + "="*80)
+        print("SUCESSO! (Amostragem de Classes)")
+        print(f"Reservatórios ({len(reservatorios_df)} classes, com pesos) guardados em:\n'{reservatorios_path}'")
+        print(f"Amostra de {len(scatter_df)} pares (loc, cbo) guardada em:\n'{scatter_path}'")
+        print("="*80)
+
 
 if __name__ == "__main__":
-    consolidate_and_summarize_metrics()
+    instrumentacao.configurar_por_argv()
+    with instrumentacao.etapa("relatorios"):
+        consolidate_and_summarize_metrics()
+    instrumentacao.salvar_relatorio()
 
@@ -0,0 +1,405 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import consolidate_results
+from dataset import caminho_arrow, carregar_dataset
+
+# --- CONFIGURE AQUI ---
+# Serviço local de consultas sobre o dataset final. O dataset é carregado uma
+# vez para memória (colunas numpy) e cada coluna numérica ganha um índice
+# ordenado; quando a etapa de junção publica uma nova versão (CSV ou Arrow),
+# o índice é reconstruído e trocado sem interromper as consultas.
+HOST = "127.0.0.1"
+PORT = 8767
+DATASET_FILE = consolidate_results.FINAL_OUTPUT_FILE
+
+# Intervalo entre verificações de uma nova versão do dataset
+INTERVALO_RECARGA_S = 2.0
+
+# Número de linhas devolvidas quando a consulta não indica um limite
+LIMITE_PADRAO = 50
+
+# Nomes curtos aceites nas consultas
+ALIASES = {
+    'stars': 'popularidade_estrelas',
+    'estrelas': 'popularidade_estrelas',
+    'releases': 'atividade_releases',
+    'age': 'maturidade_anos',
+    'idade': 'maturidade_anos',
+    'loc': 'total_loc',
+}
+# --- FIM DA CONFIGURAÇÃO ---
+
+AGREGACOES = ('count', 'mean', 'median', 'min', 'max', 'sum')
+_FILTRO = re.compile(r'^\s*(\w+)\s*(>=|<=|==|!=|=|>|<)\s*(.+?)\s*$')
+
+
+class ErroConsulta(ValueError):
+    """
+    Consulta mal formada (coluna desconhecida, operador inválido, ...).
+    """
+
+
+class IndiceColunar:
+    """
+    Dataset em memória em formato colunar, com um índice ordenado por
+    coluna numérica: os filtros de intervalo são resolvidos com pesquisa
+    binária e o top-k percorre a ordem já calculada.
+    """
+
+    def __init__(self, df, versao=None):
+        self.versao = versao
+        self.total = len(df)
+        self.colunas = {col: df[col].to_numpy() for col in df.columns}
+        self.numericas = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+        self.ordem = {}
+        self.ordenados = {}
+        for col in self.numericas:
+            valores = self.colunas[col].astype(float, copy=False)
+            # Os NaN ficam fora do índice: nenhum filtro de intervalo os aceita
+            ordem = np.argsort(valores, kind='stable')
+            ordem = ordem[~np.isnan(valores[ordem])]
+            self.ordem[col] = ordem
+            self.ordenados[col] = valores[ordem]
+
+    def coluna(self, nome):
+        nome = ALIASES.get(nome, nome)
+        if nome not in self.colunas:
+            raise ErroConsulta(f"Coluna desconhecida: '{nome}'.")
+        return nome
+
+    def _linhas_no_intervalo(self, col, operador, valor):
+        """
+        Posições das linhas que satisfazem 'col operador valor', obtidas
+        por pesquisa binária no índice ordenado.
+        """
+        ordenados = self.ordenados[col]
+        if operador == '>':
+            inicio, fim = np.searchsorted(ordenados, valor, side='right'), len(ordenados)
+        elif operador == '>=':
+            inicio, fim = np.searchsorted(ordenados, valor, side='left'), len(ordenados)
+        elif operador == '<':
+            inicio, fim = 0, np.searchsorted(ordenados, valor, side='left')
+        elif operador == '<=':
+            inicio, fim = 0, np.searchsorted(ordenados, valor, side='right')
+        else:
+            inicio, fim = np.searchsorted(ordenados, valor, side='left'), np.searchsorted(ordenados, valor, side='right')
+        return self.ordem[col][inicio:fim]
+
+    def filtrar(self, filtros):
+        """
+        Aplica os filtros ('stars>20000', 'cbo_median>5', ...) e devolve uma
+        máscara booleana das linhas selecionadas.
+        """
+        mascara = np.ones(self.total, dtype=bool)
+        condicoes = []
+        for filtro in filtros:
+            correspondencia = _FILTRO.match(filtro)
+            if not correspondencia:
+                raise ErroConsulta(f"Filtro inválido: '{filtro}' (use por ex. 'stars>20000').")
+            col, operador, valor = correspondencia.groups()
+            col = self.coluna(col)
+            operador = '==' if operador == '=' else operador
+            if col in self.ordem:
+                try:
+                    valor = float(valor)
+                except ValueError:
+                    raise ErroConsulta(f"Valor não numérico para '{col}': '{valor}'.")
+            elif operador not in ('==', '!='):
+                raise ErroConsulta(f"A coluna '{col}' não é numérica; use apenas '=' ou '!='.")
+            condicoes.append((col, operador, valor))
+
+        # As condições de intervalo mais seletivas são aplicadas primeiro
+        def tamanho(condicao):
+            col, operador, valor = condicao
+            if col in self.ordem and operador != '!=':
+                return len(self._linhas_no_intervalo(col, operador, valor))
+            return self.total
+
+        for col, operador, valor in sorted(condicoes, key=tamanho):
+            if not mascara.any():
+                break
+            if col in self.ordem and operador != '!=':
+                selecionadas = np.zeros(self.total, dtype=bool)
+                selecionadas[self._linhas_no_intervalo(col, operador, valor)] = True
+                mascara &= selecionadas
+            elif operador == '!=':
+                mascara &= self.colunas[col] != valor
+            else:
+                mascara &= self.colunas[col] == valor
+        return mascara
+
+    def top_k(self, mascara, col, k, crescente=False):
+        """
+        Posições das k primeiras linhas selecionadas pela ordem de 'col'.
+        """
+        ordem = self.ordem[col] if crescente else self.ordem[col][::-1]
+        return ordem[mascara[ordem]][:k]
+
+    def consultar(self, filtros=(), ordenar=None, limite=LIMITE_PADRAO, crescente=False, colunas=None):
+        """
+        Filtra, ordena e devolve (total de linhas selecionadas, DataFrame com
+        as primeiras 'limite' linhas).
+        """
+        if limite < 0:
+            raise ErroConsulta(f"O limite não pode ser negativo: {limite}.")
+        mascara = self.filtrar(filtros)
+        if ordenar:
+            ordenar = self.coluna(ordenar)
+            if ordenar not in self.ordem:
+                raise ErroConsulta(f"Só é possível ordenar por colunas numéricas: '{ordenar}'.")
+            posicoes = self.top_k(mascara, ordenar, limite, crescente)
+        else:
+            posicoes = np.flatnonzero(mascara)[:limite]
+        colunas = [self.coluna(c) for c in colunas] if colunas else list(self.colunas)
+        resultado = pd.DataFrame({col: self.colunas[col][posicoes] for col in colunas})
+        return int(mascara.sum()), resultado
+
+    def agrupar(self, por, metricas, agregacao='mean', filtros=(), faixas=None):
+        """
+        Agrega as métricas das linhas selecionadas por uma coluna. Colunas
+        numéricas são divididas em 'faixas' grupos de igual frequência (por
+        padrão, tercis, como nas tabelas das RQs).
+        """
+        if agregacao not in AGREGACOES:
+            raise ErroConsulta(f"Agregação inválida: '{agregacao}' (use {', '.join(AGREGACOES)}).")
+        mascara = self.filtrar(filtros)
+        por = self.coluna(por)
+        metricas = [self.coluna(m) for m in metricas]
+        nao_numericas = [m for m in metricas if m not in self.ordem]
+        if nao_numericas and agregacao != 'count':
+            raise ErroConsulta(f"A agregação '{agregacao}' só se aplica a colunas numéricas: "
+                               f"{', '.join(nao_numericas)}.")
+        dados = pd.DataFrame({col: self.colunas[col][mascara] for col in dict.fromkeys([por] + metricas)})
+        if dados.empty:
+            return pd.DataFrame(columns=['repos'] + metricas)
+
+        chave = dados[por]
+        if por in self.ordem:
+            if faixas is not None and faixas < 1:
+                raise ErroConsulta("O número de faixas tem de ser pelo menos 1.")
+            dados = dados[chave.notna()]
+            if dados.empty:
+                return pd.DataFrame(columns=['repos'] + metricas)
+            # Nunca mais faixas do que linhas selecionadas
+            faixas = min(faixas or 3, len(dados))
+            try:
+                chave = pd.qcut(dados[por].rank(method='first'), faixas, labels=False, duplicates='drop')
+            except ValueError as e:
+                raise ErroConsulta(f"Não foi possível dividir '{por}' em {faixas} faixas: {e}")
+            limites = dados[por].groupby(chave).agg(['min', 'max'])
+            rotulos = [f"{linha['min']:g}–{linha['max']:g}" for _, linha in limites.iterrows()]
+            chave = pd.Series(pd.Categorical.from_codes(chave, rotulos, ordered=True), index=dados.index)
+        tabela = dados[metricas].groupby(chave, sort=True, observed=True).agg(agregacao)
+        tabela.insert(0, 'repos', chave.value_counts().reindex(tabela.index))
+        tabela.index.name = por
+        return tabela
+
+
+class ServicoConsultas:
+    """
+    Mantém o índice do dataset atual e reconstrói-o, numa thread, sempre que
+    o CSV ou o Arrow publicados pela etapa de junção mudam. A troca é uma
+    simples atribuição, pelo que as consultas em curso terminam sobre a
+    versão anterior.
+    """
+
+    def __init__(self, caminho=DATASET_FILE, intervalo=INTERVALO_RECARGA_S):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.indice = None
+        self.parar = threading.Event()
+
+    def versao_publicada(self):
+        versoes = [os.stat(p).st_mtime_ns for p in (self.caminho, caminho_arrow(self.caminho)) if os.path.exists(p)]
+        return max(versoes) if versoes else None
+
+    def recarregar(self):
+        """
+        Reconstrói o índice se houver uma nova versão. Devolve True se recarregou.
+        """
+        versao = self.versao_publicada()
+        if versao is None or (self.indice is not None and versao == self.indice.versao):
+            return False
+        inicio = time.perf_counter()
+        try:
+            indice = IndiceColunar(carregar_dataset(self.caminho, copiar=True), versao)
+        except Exception as e:
+            # Ficheiro a meio de ser escrito: tenta de novo no próximo ciclo
+            print(f"AVISO: Não foi possível carregar '{self.caminho}'. Erro: {e}")
+            return False
+        self.indice = indice
+        print(f"Índice carregado: {indice.total} repositórios, {len(indice.numericas)} colunas indexadas "
+              f"({(time.perf_counter() - inicio) * 1000:.0f} ms).")
+        return True
+
+    def _ciclo_recarga(self):
+        while not self.parar.wait(self.intervalo):
+            self.recarregar()
+
+    def iniciar(self):
+        self.recarregar()
+        if self.indice is None:
+            raise FileNotFoundError(f"O ficheiro '{self.caminho}' não foi encontrado.")
+        threading.Thread(target=self._ciclo_recarga, daemon=True).start()
+
+    def executar(self, parametros):
+        """
+        Executa uma consulta a partir de parâmetros no formato de query
+        string ({nome: [valores]}) e devolve o corpo da resposta em JSON.
+        """
+        indice = self.indice
+        inicio = time.perf_counter()
+
+        def valor(nome, padrao=None):
+            return parametros.get(nome, [padrao])[-1]
+
+        filtros = parametros.get('filtro', [])
+        if valor('agrupar'):
+            faixas = valor('faixas')
+            tabela = indice.agrupar(valor('agrupar'), _lista(parametros.get('metricas')) or ['cbo_median', 'dit_median', 'lcom_median'],
+                                    valor('agregacao', 'mean'), filtros, int(faixas) if faixas else None)
+            linhas = tabela.reset_index().to_dict('records')
+            total = int(tabela['repos'].sum()) if len(tabela) else 0
+        else:
+            total, tabela = indice.consultar(
+                filtros, valor('ordenar'), int(valor('limite', LIMITE_PADRAO)),
+                valor('crescente', '0') in ('1', 'true', 'sim'), _lista(parametros.get('colunas')))
+            linhas = tabela.to_dict('records')
+        return {
+            'total': total,
+            'linhas': json.loads(pd.DataFrame(linhas).to_json(orient='records')) if linhas else [],
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+            'versao': indice.versao,
+        }
+
+
+def _lista(valores):
+    """
+    Junta parâmetros repetidos e separados por vírgulas numa só lista.
+    """
+    return [v for valor in (valores or []) for v in valor.split(',') if v]
+
+
+class ConsultaHandler(BaseHTTPRequestHandler):
+    servico = None
+    silencioso = False
+
+    def log_message(self, format, *args):
+        if not self.silencioso:
+            super().log_message(format, *args)
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        indice = self.servico.indice
+        if url.path == '/info':
+            self._responder(200, {
+                'dataset': os.path.abspath(self.servico.caminho),
+                'versao': indice.versao,
+                'repositorios': indice.total,
+                'colunas': list(indice.colunas),
+                'indexadas': indice.numericas,
+                'aliases': ALIASES,
+            })
+        elif url.path == '/consulta':
+            try:
+                self._responder(200, self.servico.executar(parse_qs(url.query)))
+            except (ErroConsulta, ValueError) as e:
+                self._responder(400, {'erro': str(e)})
+            except Exception as e:
+                traceback.print_exc()
+                self._responder(500, {'erro': f"Erro interno: {type(e).__name__}: {e}"})
+        else:
+            self._responder(404, {'erro': "Use /consulta ou /info."})
+
+
+def criar_servidor(servico, host=HOST, port=PORT, silencioso=False):
+    """
+    Cria (sem iniciar) o servidor HTTP sobre um ServicoConsultas já iniciado.
+    """
+    handler = type('Handler', (ConsultaHandler,), {'servico': servico, 'silencioso': silencioso})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="query", description="Consultas indexadas sobre o dataset final.")
+    parser.add_argument('--dataset', default=DATASET_FILE, help="CSV publicado pela etapa de junção")
+    sub = parser.add_subparsers(dest='acao', required=True)
+
+    p = sub.add_parser('servir', help="inicia o serviço HTTP (recarrega o índice a cada nova versão)")
+    p.add_argument('--host', default=HOST)
+    p.add_argument('--porta', type=int, default=PORT)
+    p.add_argument('--intervalo', type=float, default=INTERVALO_RECARGA_S,
+                   help="segundos entre verificações de uma nova versão do dataset")
+    p.add_argument('--silencioso', action='store_true', help="não registar cada requisição")
+
+    p = sub.add_parser('consultar', help="executa uma consulta e mostra o resultado")
+    p.add_argument('filtros', nargs='*', help="ex.: 'stars>20000' 'cbo_median>5'")
+    p.add_argument('--ordenar', help="coluna numérica usada no top-k (decrescente)")
+    p.add_argument('--crescente', action='store_true')
+    p.add_argument('--limite', type=int, default=LIMITE_PADRAO)
+    p.add_argument('--colunas', nargs='+')
+    p.add_argument('--agrupar', help="coluna de agrupamento (numéricas são divididas em faixas)")
+    p.add_argument('--faixas', type=int, help="número de faixas de igual frequência (padrão: 3)")
+    p.add_argument('--metricas', nargs='+', default=['cbo_median', 'dit_median', 'lcom_median'])
+    p.add_argument('--agregacao', choices=AGREGACOES, default='mean')
+
+    args = parser.parse_args(argv)
+    servico = ServicoConsultas(args.dataset, getattr(args, 'intervalo', INTERVALO_RECARGA_S))
+    try:
+        servico.iniciar()
+    except FileNotFoundError as e:
+        print(f"ERRO: {e}")
+        return 1
+
+    if args.acao == 'servir':
+        servidor = criar_servidor(servico, args.host, args.porta, args.silencioso)
+        print(f"Serviço de consultas em http://{args.host}:{args.porta}/consulta "
+              f"(ex.: /consulta?filtro=stars>20000&filtro=cbo_median>5&ordenar=lcom_mean&limite=10)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            print("\nServiço terminado.")
+        finally:
+            servico.parar.set()
+            servidor.server_close()
+        return 0
+
+    indice = servico.indice
+    inicio = time.perf_counter()
+    try:
+        if args.agrupar:
+            resultado = indice.agrupar(args.agrupar, args.metricas, args.agregacao, args.filtros, args.faixas)
+            total = int(resultado['repos'].sum()) if len(resultado) else 0
+        else:
+            total, resultado = indice.consultar(args.filtros, args.ordenar, args.limite, args.crescente, args.colunas)
+    except (ErroConsulta, ValueError) as e:
+        print(f"ERRO: {e}")
+        return 1
+    decorrido = (time.perf_counter() - inicio) * 1000
+
+    print(resultado.to_string(index=bool(args.agrupar)) if len(resultado) else "(nenhuma linha)")
+    print(f"\n{total} repositórios selecionados ({decorrido:.2f} ms).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+import argparse
+import csv
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+# --- CONFIGURE AQUI ---
+# Base SQLite onde cada coleta fica guardada como uma versão. Só são gravados
+# os campos que mudaram em relação à versão anterior de cada repositório.
+SNAPSHOT_DB = "snapshots.sqlite"
+
+# Coluna que identifica o repositório e colunas versionadas. A maturidade
+# não é versionada: é recalculada a partir da data atual em cada coleta e
+# mudaria em todos os repositórios, anulando a codificação por diferenças.
+CHAVE = 'nameWithOwner'
+CAMPOS = ['popularidade_estrelas', 'atividade_releases']
+
+# Campo interno que marca se o repositório está presente na versão (1/0)
+PRESENTE = '_presente'
+# --- FIM DA CONFIGURAÇÃO ---
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS versoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    serie TEXT NOT NULL,
+    coletado_em TEXT NOT NULL,
+    origem TEXT,
+    total_repos INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_versoes_serie_data ON versoes (serie, coletado_em);
+
+CREATE TABLE IF NOT EXISTS valores (
+    serie TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    campo TEXT NOT NULL,
+    versao INTEGER NOT NULL REFERENCES versoes (id),
+    valor,
+    PRIMARY KEY (serie, repo, campo, versao)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_valores_versao ON valores (serie, versao);
+"""
+
+
+def conectar(caminho=SNAPSHOT_DB, somente_leitura=False):
+    """
+    Abre a base de snapshots. Em modo só de leitura a base tem de existir
+    (FileNotFoundError), para que uma consulta na pasta errada não crie
+    uma base vazia.
+    """
+    if somente_leitura:
+        if not os.path.exists(caminho):
+            raise FileNotFoundError(f"A base de snapshots '{caminho}' não foi encontrada.")
+        conexao = sqlite3.connect(f"{Path(os.path.abspath(caminho)).as_uri()}?mode=ro", uri=True)
+        conexao.row_factory = sqlite3.Row
+        return conexao
+    conexao = sqlite3.connect(caminho)
+    conexao.row_factory = sqlite3.Row
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+def _converter(valor):
+    """
+    Converte os valores lidos do CSV para número quando possível, para que
+    '151692' e '151692.0' não sejam vistos como alterações.
+    """
+    if valor is None or valor == '':
+        return None
+    try:
+        numero = float(valor)
+    except ValueError:
+        return valor
+    return int(numero) if numero.is_integer() else numero
+
+
+def estado_atual(conexao, serie):
+    """
+    Devolve o último valor conhecido de cada campo, por repositório:
+    {repo: {campo: valor}}.
+    """
+    linhas = conexao.execute("""
+        SELECT v.repo, v.campo, v.valor
+        FROM valores v
+        JOIN (SELECT repo, campo, MAX(versao) AS versao
+              FROM valores WHERE serie = ? GROUP BY repo, campo) ult
+          ON v.repo = ult.repo AND v.campo = ult.campo AND v.versao = ult.versao
+        WHERE v.serie = ?
+    """, (serie, serie))
+    estado = {}
+    for linha in linhas:
+        estado.setdefault(linha['repo'], {})[linha['campo']] = linha['valor']
+    return estado
+
+
+def registrar_snapshot(csv_path, serie='Java', coletado_em=None, caminho_db=SNAPSHOT_DB):
+    """
+    Regista um CSV no formato de metadata.csv como uma nova versão.
+    Devolve (id_da_versao, campos_alterados). As versões são codificadas
+    como diferenças em relação à anterior, por isso uma coleta mais antiga
+    do que a última versão da série é recusada (ValueError).
+    """
+    if coletado_em:
+        coletado_em = datetime.fromisoformat(coletado_em).isoformat(timespec='seconds')
+    else:
+        coletado_em = datetime.fromtimestamp(os.path.getmtime(csv_path)).isoformat(timespec='seconds')
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        linhas = [linha for linha in csv.DictReader(f) if linha.get(CHAVE)]
+
+    with conectar(caminho_db) as conexao:
+        ultima = conexao.execute("SELECT MAX(coletado_em) FROM versoes WHERE serie = ?", (serie,)).fetchone()[0]
+        if ultima is not None and coletado_em < ultima:
+            raise ValueError(f"A coleta de {coletado_em} é anterior à última versão da série '{serie}' "
+                             f"({ultima}); só é possível acrescentar versões mais recentes.")
+        anterior = estado_atual(conexao, serie)
+        cursor = conexao.execute(
+            "INSERT INTO versoes (serie, coletado_em, origem, total_repos) VALUES (?, ?, ?, ?)",
+            (serie, coletado_em, os.path.abspath(csv_path), len(linhas)),
+        )
+        versao = cursor.lastrowid
+
+        deltas = []
+        vistos = set()
+        for linha in linhas:
+            repo = linha[CHAVE]
+            vistos.add(repo)
+            antigo = anterior.get(repo, {})
+            novo = {campo: _converter(linha.get(campo)) for campo in CAMPOS}
+            novo[PRESENTE] = 1
+            deltas.extend((serie, repo, campo, versao, valor)
+                          for campo, valor in novo.items()
+                          if campo not in antigo or antigo[campo] != valor)
+
+        # Repositórios que saíram da coleta ficam marcados como ausentes
+        deltas.extend((serie, repo, PRESENTE, versao, 0)
+                      for repo, campos in anterior.items()
+                      if repo not in vistos and campos.get(PRESENTE) == 1)
+
+        conexao.executemany("INSERT INTO valores VALUES (?, ?, ?, ?, ?)", deltas)
+
+    return versao, len(deltas)
+
+
+def listar_versoes(serie='Java', caminho_db=SNAPSHOT_DB):
+    with conectar(caminho_db, somente_leitura=True) as conexao:
+        return [dict(linha) for linha in conexao.execute(
+            "SELECT * FROM versoes WHERE serie = ? ORDER BY id", (serie,))]
+
+
+def crescimento(n=2, serie='Java', campos=('popularidade_estrelas', 'atividade_releases'), caminho_db=SNAPSHOT_DB):
+    """
+    Crescimento de cada campo por repositório entre a primeira e a última
+    das N versões mais recentes. Cada valor é resolvido por uma busca no
+    índice (serie, repo, campo, versao), sem reconstruir as versões inteiras.
+    """
+    marcadores = ", ".join("?" for _ in campos)
+    with conectar(caminho_db, somente_leitura=True) as conexao:
+        limites = conexao.execute("""
+            SELECT MIN(id) AS inicio, MAX(id) AS fim
+            FROM (SELECT id FROM versoes WHERE serie = ? ORDER BY id DESC LIMIT ?)
+        """, (serie, n)).fetchone()
+        if limites['fim'] is None:
+            return []
+
+        linhas = conexao.execute(f"""
+            WITH pares AS (
+                SELECT DISTINCT repo, campo FROM valores
+                WHERE serie = ? AND campo IN ({marcadores})
+            )
+            SELECT p.repo, p.campo,
+                (SELECT valor FROM valores v WHERE v.serie = ? AND v.repo = p.repo
+                    AND v.campo = p.campo AND v.versao <= ?
+                    ORDER BY v.versao DESC LIMIT 1) AS valor_inicio,
+                (SELECT valor FROM valores v WHERE v.serie = ? AND v.repo = p.repo
+                    AND v.campo = p.campo AND v.versao <= ?
+                    ORDER BY v.versao DESC LIMIT 1) AS valor_fim
+            FROM pares p
+        """, (serie, *campos, serie, limites['inicio'], serie, limites['fim']))
+
+        resultado = {}
+        for linha in linhas:
+            registro = resultado.setdefault(linha['repo'], {'repo': linha['repo']})
+            inicio, fim = linha['valor_inicio'], linha['valor_fim']
+            registro[f"{linha['campo']}_inicio"] = inicio
+            registro[f"{linha['campo']}_fim"] = fim
+            registro[f"{linha['campo']}_crescimento"] = fim - inicio if None not in (inicio, fim) else None
+    return list(resultado.values())
+
+
+def historico(repo, serie='Java', desde=None, ate=None, caminho_db=SNAPSHOT_DB):
+    """
+    Valores de um repositório em cada versão dentro do intervalo de datas
+    [desde, ate] (datas ISO; ambos opcionais). Um 'ate' só com a data
+    inclui todo esse dia.
+    """
+    desde = datetime.fromisoformat(desde).isoformat(timespec='seconds') if desde else ''
+    if ate:
+        limite = datetime.fromisoformat(ate)
+        if len(ate) <= 10:  # só a data: até ao fim do dia
+            limite = limite.replace(hour=23, minute=59, second=59)
+        ate = limite.isoformat(timespec='seconds')
+    with conectar(caminho_db, somente_leitura=True) as conexao:
+        versoes = conexao.execute("""
+            SELECT id, coletado_em FROM versoes
+            WHERE serie = ? AND coletado_em >= ? AND coletado_em <= ?
+            ORDER BY id
+        """, (serie, desde, ate or '9999')).fetchall()
+        if not versoes:
+            return []
+
+        alteracoes = conexao.execute("""
+            SELECT campo, versao, valor FROM valores
+            WHERE serie = ? AND repo = ? AND versao <= ?
+            ORDER BY versao
+        """, (serie, repo, versoes[-1]['id'])).fetchall()
+
+    resultado = []
+    atual = {}
+    posicao = 0
+    for versao in versoes:
+        while posicao < len(alteracoes) and alteracoes[posicao]['versao'] <= versao['id']:
+            atual[alteracoes[posicao]['campo']] = alteracoes[posicao]['valor']
+            posicao += 1
+        if atual.get(PRESENTE) == 1:
+            resultado.append(dict({'versao': versao['id'], 'coletado_em': versao['coletado_em']},
+                                  **{campo: atual.get(campo) for campo in CAMPOS}))
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="snapshots", description="Histórico versionado das coletas de metadados.")
+    parser.add_argument('--db', default=SNAPSHOT_DB)
+    parser.add_argument('--serie', default='Java', help="série (ex.: linguagem) do histórico")
+    sub = parser.add_subparsers(dest='acao', required=True)
+
+    p = sub.add_parser('registrar', help="regista um CSV de metadados como nova versão")
+    p.add_argument('csv')
+    p.add_argument('--em', help="data da coleta (ISO); por padrão, a data do ficheiro")
+
+    sub.add_parser('versoes', help="lista as versões registadas")
+
+    p = sub.add_parser('crescimento', help="crescimento por repositório nas últimas N versões")
+    p.add_argument('-n', type=int, default=2)
+    p.add_argument('--top', type=int, default=20, help="mostra os N repositórios que mais cresceram em estrelas")
+
+    p = sub.add_parser('historico', help="valores de um repositório ao longo das versões")
+    p.add_argument('repo')
+    p.add_argument('--desde')
+    p.add_argument('--ate')
+
+    args = parser.parse_args(argv)
+
+    if args.acao == 'registrar':
+        try:
+            versao, alteracoes = registrar_snapshot(args.csv, args.serie, args.em, args.db)
+        except ValueError as e:
+            print(f"ERRO: {e}")
+            return 1
+        print(f"Versão {versao} registada ({alteracoes} campos alterados) em '{args.db}'.")
+        return 0
+
+    if not os.path.exists(args.db):
+        print(f"ERRO: A base de snapshots '{args.db}' não foi encontrada.")
+        return 1
+    if args.acao == 'versoes':
+        for versao in listar_versoes(args.serie, args.db):
+            print(f"{versao['id']:>4}  {versao['coletado_em']}  {versao['total_repos']:>5} repos  {versao['origem']}")
+    elif args.acao == 'crescimento':
+        linhas = crescimento(args.n, args.serie, caminho_db=args.db)
+        linhas.sort(key=lambda r: r.get('popularidade_estrelas_crescimento') or 0, reverse=True)
+        for r in linhas[:args.top]:
+            print(f"{r['repo']:<50} estrelas {r.get('popularidade_estrelas_crescimento')!s:>7}  "
+                  f"releases {r.get('atividade_releases_crescimento')!s:>5}")
+    elif args.acao == 'historico':
+        for r in historico(args.repo, args.serie, args.desde, args.ate, args.db):
+            print(r)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,15 @@
+import os
+import sys
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+# Torna os módulos partilhados de 'code/' importáveis a partir desta pasta
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+import instrumentacao
+from dataset import carregar_dataset
+
 # Define um estilo visual mais agradável para os gráficos
 sns.set_theme(style="whitegrid")
 
@@ -14,7 +22,9 @@ def gerar_grafico_rq4():
         # Carrega o dataset a partir do ficheiro CSV local
         filepath = './final_analysis_dataset.csv'
         print(f"A carregar dados de '{filepath}'...")
-        df = pd.read_csv(filepath)
+        with instrumentacao.etapa("leitura"):
+            df = carregar_dataset(filepath)
+            instrumentacao.contar(linhas=len(df), bytes_processados=os.path.getsize(filepath))
 
         # Verifica se a coluna 'total_loc' existe
         if 'total_loc' not in df.columns:
@@ -86,5 +96,7 @@ def gerar_grafico_rq4():
         print(f"Ocorreu um erro inesperado: {e}")
 
 if __name__ == "__main__":
-    gerar_grafico_rq4()
-
+    instrumentacao.configurar_por_argv()
+    with instrumentacao.etapa("graficos"):
+        gerar_grafico_rq4()
+    instrumentacao.salvar_relatorio()
@@ -0,0 +1,22 @@
+"""
+Ponto de entrada único do pipeline: ``python -m pipeline <subcomando>``.
+
+As bibliotecas pesadas (pandas, matplotlib, seaborn) só são importadas
+dentro dos subcomandos que as usam.
+"""
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_CODIGO = os.path.join(RAIZ, 'code')
+PASTA_GRAFICOS = os.path.join(RAIZ, 'codigosGeradoresdeGraficos')
+
+
+def preparar_caminhos():
+    """
+    Torna os scripts de 'code/' e de 'codigosGeradoresdeGraficos/'
+    importáveis como módulos.
+    """
+    for pasta in (PASTA_CODIGO, PASTA_GRAFICOS):
+        if pasta not in sys.path:
+            sys.path.insert(0, pasta)
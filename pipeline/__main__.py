@@ -0,0 +1,210 @@
+import argparse
+import importlib
+import sys
+
+from pipeline import preparar_caminhos
+
+# Scripts de gráficos disponíveis: nome curto -> (módulo, função)
+GRAFICOS = {
+    'geral': ('gerar_graficos_gerais', 'gerar_graficos_analise_geral'),
+    'rq01': ('gerar_gráficos_rq01', 'gerar_grafico_rq1'),
+    'rq02': ('gerar_graficos_rq02', 'gerar_grafico_rq2'),
+    'rq03': ('gerar_graficos_rq03', 'gerar_grafico_rq3'),
+    'rq04': ('gerar_gráficos_rq04', 'gerar_grafico_rq4'),
+}
+
+# Subcomandos que importam pandas/matplotlib e por isso são enviados ao
+# worker pré-aquecido quando ele está a correr
+SUBCOMANDOS_PESADOS = {'consolidate', 'merge', 'tables', 'charts'}
+
+# Subcomandos com CLI própria: os argumentos seguintes são repassados intactos
+SUBCOMANDOS_REPASSE = {'snapshots', 'query'}
+
+
+def cmd_collect(args):
+    import main as coletor
+    kwargs = {'pasta_saida': args.saida}
+    if args.db:
+        kwargs['caminho_db'] = args.db
+    if coletor.coletar_metadados(coletor.criar_specs(args.linguagens, args.total), **kwargs):
+        sys.exit(1)
+
+
+def cmd_consolidate(args):
+    import reports_generator
+    if args.pasta:
+        reports_generator.PATH_TO_OUTPUT_FOLDER = args.pasta
+    reports_generator.consolidate_and_summarize_metrics()
+
+
+def cmd_merge(args):
+    import consolidate_results
+    if args.pasta:
+        consolidate_results.PATH_TO_OUTPUT_FOLDER = args.pasta
+    consolidate_results.merge_datasets_with_fix()
+
+
+def cmd_tables(args):
+    if args.progressivo:
+        import agregacao_progressiva
+        import reports_generator
+        agregacao_progressiva.agregar_progressivamente(
+            args.pasta or reports_generator.PATH_TO_OUTPUT_FOLDER,
+            args.precisao, args.precisao_correlacao)
+        return
+    import tables_generator
+    tables_generator.gerar_tabela_resumo()
+
+
+def cmd_charts(args):
+    desconhecidos = [nome for nome in args.graficos if nome not in GRAFICOS]
+    if desconhecidos:
+        print(f"ERRO: Gráfico(s) desconhecido(s): {', '.join(desconhecidos)}. "
+              f"Opções: {', '.join(GRAFICOS)}.")
+        sys.exit(2)
+    for nome in args.graficos or list(GRAFICOS):
+        modulo, funcao = GRAFICOS[nome]
+        getattr(importlib.import_module(modulo), funcao)()
+
+
+def cmd_watch(args):
+    import observador
+    import reports_generator
+    pasta = args.pasta or reports_generator.PATH_TO_OUTPUT_FOLDER
+    observador.ObservadorCK(pasta, args.intervalo, args.debounce).observar(args.uma_vez)
+
+
+def cmd_snapshots(args):
+    import snapshots
+    codigo = snapshots.main(args.repasse)
+    if codigo:
+        sys.exit(codigo)
+
+
+def cmd_query(args):
+    import servico_consultas
+    codigo = servico_consultas.main(args.repasse)
+    if codigo:
+        sys.exit(codigo)
+
+
+def cmd_worker(args):
+    from pipeline import worker
+    worker.servir(args.porta)
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline",
+        description="Pipeline de coleta e análise de qualidade de repositórios.",
+    )
+    parser.add_argument('--instrumentar', action='store_true',
+                        help="grava um relatório JSON com tempos e memória por etapa")
+    parser.add_argument('--perfil', metavar='ETAPA', help="gera um perfil cProfile da etapa indicada")
+    parser.add_argument('--sem-worker', action='store_true',
+                        help="não usar o worker pré-aquecido, mesmo que esteja a correr")
+    sub = parser.add_subparsers(dest='subcomando', required=True)
+
+    p = sub.add_parser('collect', help="coleta os metadados dos repositórios no GitHub")
+    p.add_argument('--linguagens', nargs='+', default=['Java'])
+    p.add_argument('--total', type=int, default=1000)
+    p.add_argument('--saida', help="pasta onde gravar os CSVs (por padrão, a pasta atual)")
+    p.add_argument('--db', help="base SQLite do histórico de coletas (por padrão, snapshots.sqlite)")
+    p.set_defaults(func=cmd_collect)
+
+    p = sub.add_parser('consolidate', help="resume os ficheiros *class.csv do CK por repositório")
+    p.add_argument('--pasta', help="pasta com as saídas do CK (PATH_TO_OUTPUT_FOLDER)")
+    p.set_defaults(func=cmd_consolidate)
+
+    p = sub.add_parser('merge', help="junta o resumo do CK com os metadados")
+    p.add_argument('--pasta', help="pasta com os CSVs de entrada (PATH_TO_OUTPUT_FOLDER)")
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('tables', help="gera a tabela de resumo das RQs")
+    p.add_argument('--progressivo', action='store_true',
+                   help="estima a tabela a partir de uma amostra crescente dos resultados do CK, "
+                        "com intervalos de confiança, parando ao atingir a precisão pedida")
+    p.add_argument('--pasta', help="pasta com as saídas do CK (apenas com --progressivo)")
+    p.add_argument('--precisao', type=float, default=0.05,
+                   help="meia-largura relativa máxima das médias/medianas (apenas com --progressivo)")
+    p.add_argument('--precisao-correlacao', type=float, default=0.10,
+                   help="meia-largura máxima das correlações (apenas com --progressivo)")
+    p.set_defaults(func=cmd_tables)
+
+    p = sub.add_parser('charts', help="gera os gráficos")
+    p.add_argument('graficos', nargs='*', metavar='GRAFICO',
+                   help=f"gráficos a gerar ({', '.join(GRAFICOS)}); por padrão, todos")
+    p.set_defaults(func=cmd_charts)
+
+    p = sub.add_parser('watch', help="atualiza resumos, dataset final e tabelas à medida que o CK produz resultados")
+    p.add_argument('--pasta', help="pasta com as saídas do CK (PATH_TO_OUTPUT_FOLDER)")
+    p.add_argument('--intervalo', type=float, default=5.0, help="segundos entre varrimentos da pasta")
+    p.add_argument('--debounce', type=float, default=3.0, help="segundos sem alterações antes de processar")
+    p.add_argument('--uma-vez', action='store_true', help="processa as alterações pendentes e termina")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('snapshots', add_help=False,
+                       help="histórico versionado das coletas (registrar, versoes, crescimento, historico)")
+    p.set_defaults(func=cmd_snapshots)
+
+    p = sub.add_parser('query', add_help=False,
+                       help="consultas indexadas sobre o dataset final (servir, consultar)")
+    p.set_defaults(func=cmd_query)
+
+    p = sub.add_parser('worker', help="inicia um worker com as bibliotecas pesadas já importadas")
+    p.add_argument('--porta', type=int, default=None)
+    p.set_defaults(func=cmd_worker)
+
+    return parser
+
+
+def _parse(argv, conhecidos=False):
+    """
+    Interpreta argv; para os subcomandos de repasse, o que vem depois do
+    nome do subcomando fica em 'args.repasse'.
+    """
+    repasse = []
+    for i, arg in enumerate(argv):
+        if arg in SUBCOMANDOS_REPASSE:
+            argv, repasse = argv[:i + 1], argv[i + 1:]
+            break
+    parser = criar_parser()
+    args = parser.parse_known_args(argv)[0] if conhecidos else parser.parse_args(argv)
+    args.repasse = repasse
+    return args
+
+
+def executar(argv):
+    """
+    Executa o subcomando no processo atual.
+    """
+    preparar_caminhos()
+    args = _parse(argv)
+
+    import instrumentacao
+    # Variáveis de ambiente INSTRUMENTAR / INSTRUMENTAR_PERFIL / INSTRUMENTAR_RELATORIO
+    instrumentacao.configurar_por_argv([])
+    if args.instrumentar or args.perfil:
+        instrumentacao.ativar(etapa_perfil=args.perfil)
+
+    with instrumentacao.etapa(args.subcomando):
+        args.func(args)
+    instrumentacao.salvar_relatorio()
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = _parse(argv, conhecidos=True)
+
+    if args.subcomando in SUBCOMANDOS_PESADOS and not args.sem_worker:
+        from pipeline import worker
+        codigo = worker.executar_remotamente(argv)
+        if codigo is not None:
+            return codigo
+
+    return executar(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import os
+import secrets
+import signal
+import sys
+import traceback
+from multiprocessing.connection import Client, Listener
+
+# --- CONFIGURE AQUI ---
+# O worker escuta apenas em localhost. A chave que autentica a ligação entre
+# o CLI e o worker é gerada aleatoriamente na primeira execução e guardada num
+# ficheiro legível apenas pelo utilizador (PIPELINE_WORKER_CHAVE_FICHEIRO).
+HOST = "127.0.0.1"
+PORTA = int(os.getenv("PIPELINE_WORKER_PORTA", 8766))
+FICHEIRO_CHAVE = os.getenv("PIPELINE_WORKER_CHAVE_FICHEIRO",
+                           os.path.join(os.path.expanduser("~"), ".pipeline_worker_chave"))
+# --- FIM DA CONFIGURAÇÃO ---
+
+# Variáveis de ambiente do cliente aplicadas a cada pedido
+VARIAVEIS_REPASSADAS = ('INSTRUMENTAR', 'INSTRUMENTAR_PERFIL', 'INSTRUMENTAR_RELATORIO')
+
+# Módulos cujas constantes de configuração (ex.: PATH_TO_OUTPUT_FOLDER) os
+# subcomandos podem alterar
+MODULOS_CONFIGURAVEIS = ('consolidate_results', 'reports_generator', 'tables_generator')
+
+
+def obter_chave(criar=False):
+    """
+    Lê a chave do worker. Com criar=True, gera-a (32 bytes aleatórios) se
+    ainda não existir, num ficheiro com permissões 0600. Devolve None se o
+    ficheiro não existir e criar=False.
+    """
+    if criar and not os.path.exists(FICHEIRO_CHAVE):
+        try:
+            descritor = os.open(FICHEIRO_CHAVE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # criado por outro processo entretanto
+        else:
+            with os.fdopen(descritor, 'w') as ficheiro:
+                ficheiro.write(secrets.token_hex(32))
+    try:
+        with open(FICHEIRO_CHAVE, encoding='utf-8') as ficheiro:
+            chave = ficheiro.read().strip()
+    except FileNotFoundError:
+        return None
+    if hasattr(os, 'getuid') and os.stat(FICHEIRO_CHAVE).st_mode & 0o077:
+        raise PermissionError(f"O ficheiro de chave '{FICHEIRO_CHAVE}' é acessível a outros utilizadores; "
+                              "use 'chmod 600'.")
+    return chave.encode() if chave else None
+
+
+class _SaidaRemota:
+    """
+    Substitui stdout/stderr no processo filho e reencaminha o texto para o
+    cliente.
+    """
+
+    def __init__(self, conexao, canal):
+        self.conexao = conexao
+        self.canal = canal
+
+    def write(self, texto):
+        if texto:
+            self.conexao.send((self.canal, texto))
+        return len(texto)
+
+    def flush(self):
+        pass
+
+
+def aquecer():
+    """
+    Importa as bibliotecas lentas uma única vez, antes de qualquer pedido.
+    """
+    from pipeline import preparar_caminhos
+    preparar_caminhos()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import pandas  # noqa: F401
+    import matplotlib.pyplot  # noqa: F401
+    import seaborn  # noqa: F401
+
+    import importlib
+    from pipeline.__main__ import GRAFICOS
+    for modulo in ['consolidate_results', 'reports_generator', 'tables_generator'] + \
+            [modulo for modulo, _ in GRAFICOS.values()]:
+        importlib.import_module(modulo)
+
+
+def _atender(conexao, pedido):
+    from pipeline.__main__ import executar
+
+    sys.stdout = _SaidaRemota(conexao, 'out')
+    sys.stderr = _SaidaRemota(conexao, 'err')
+    ambiente = pedido.get('ambiente') or {}
+    for nome in VARIAVEIS_REPASSADAS:
+        if nome in ambiente:
+            os.environ[nome] = ambiente[nome]
+        else:
+            os.environ.pop(nome, None)
+    try:
+        os.chdir(pedido['cwd'])
+        codigo = executar(pedido['argv'])
+    except SystemExit as e:
+        codigo = e.code if isinstance(e.code, int) else 1
+    except Exception:
+        traceback.print_exc()
+        codigo = 1
+    conexao.send(('fim', codigo))
+
+
+def _guardar_estado():
+    """
+    Estado global que um pedido pode alterar: constantes de configuração dos
+    scripts, variáveis de ambiente repassadas, saída padrão e pasta atual.
+    """
+    return {
+        'constantes': {nome: {k: v for k, v in vars(sys.modules[nome]).items() if k.isupper()}
+                       for nome in MODULOS_CONFIGURAVEIS if nome in sys.modules},
+        'ambiente': {nome: os.environ.get(nome) for nome in VARIAVEIS_REPASSADAS},
+        'saida': (sys.stdout, sys.stderr),
+        'cwd': os.getcwd(),
+    }
+
+
+def _restaurar_estado(estado):
+    for nome, constantes in estado['constantes'].items():
+        vars(sys.modules[nome]).update(constantes)
+    for nome, valor in estado['ambiente'].items():
+        if valor is None:
+            os.environ.pop(nome, None)
+        else:
+            os.environ[nome] = valor
+    sys.stdout, sys.stderr = estado['saida']
+    os.chdir(estado['cwd'])
+    import instrumentacao
+    instrumentacao.reiniciar()
+
+
+def servir(porta=None):
+    """
+    Inicia o worker pré-aquecido. Cada pedido corre num processo filho
+    criado com fork(), que herda as bibliotecas já importadas. Em sistemas
+    sem fork() (Windows) os pedidos correm no próprio worker, em série.
+    """
+    porta = porta or PORTA
+    print("A aquecer o worker (pandas, matplotlib, seaborn)...")
+    aquecer()
+
+    chave = obter_chave(criar=True)
+    if chave is None:
+        raise PermissionError(f"Não foi possível ler a chave do worker em '{FICHEIRO_CHAVE}'.")
+
+    pode_bifurcar = hasattr(os, 'fork')
+    if pode_bifurcar:
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    with Listener((HOST, porta), authkey=chave) as listener:
+        print(f"Worker pronto em {HOST}:{porta}. Ctrl+C para terminar.")
+        while True:
+            try:
+                conexao = listener.accept()
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                print(f"  - Aviso: Ligação recusada: {e}")
+                continue
+
+            try:
+                pedido = conexao.recv()
+                if not isinstance(pedido, dict) or not isinstance(pedido.get('argv'), list):
+                    raise ValueError("pedido mal formado")
+            except (EOFError, OSError, ValueError) as e:
+                # Cliente que desligou antes de enviar o pedido (Ctrl+C, sondagem da porta, ...)
+                print(f"  - Aviso: Pedido ignorado: {str(e) or type(e).__name__}")
+                conexao.close()
+                continue
+
+            if not pode_bifurcar:
+                # Sem fork() o pedido corre no próprio worker: o estado global
+                # que ele alterar é reposto no fim, para não afetar o seguinte.
+                estado = _guardar_estado()
+                try:
+                    _atender(conexao, pedido)
+                except (EOFError, OSError) as e:
+                    # Cliente desligou a meio do pedido; o worker continua
+                    print(f"  - Aviso: Ligação perdida: {str(e) or type(e).__name__}", file=estado['saida'][0])
+                finally:
+                    _restaurar_estado(estado)
+                    conexao.close()
+                continue
+
+            if os.fork() == 0:
+                listener.close()
+                try:
+                    _atender(conexao, pedido)
+                finally:
+                    conexao.close()
+                    os._exit(0)
+            conexao.close()
+
+
+def executar_remotamente(argv, porta=None):
+    """
+    Envia o subcomando ao worker pré-aquecido. Devolve o código de saída, ou
+    None se não houver nenhum worker a correr.
+    """
+    chave = obter_chave()
+    if chave is None:
+        return None  # sem chave nunca foi iniciado nenhum worker
+    try:
+        conexao = Client((HOST, porta or PORTA), authkey=chave)
+    except (ConnectionRefusedError, OSError):
+        return None
+
+    with conexao:
+        conexao.send({
+            'argv': list(argv),
+            'cwd': os.getcwd(),
+            'ambiente': {nome: os.environ[nome] for nome in VARIAVEIS_REPASSADAS if nome in os.environ},
+        })
+        while True:
+            try:
+                tipo, conteudo = conexao.recv()
+            except EOFError:
+                return 1
+            if tipo == 'fim':
+                return conteudo
+            destino = sys.stderr if tipo == 'err' else sys.stdout
+            destino.write(conteudo)
+            destino.flush()